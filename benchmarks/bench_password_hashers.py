@@ -0,0 +1,62 @@
+"""
+Benchmark LoginView with each password hasher.
+
+    python benchmarks/bench_password_hashers.py --logins 20
+
+Logins run one after another in a single thread, so logins/s is per CPU core.
+"""
+
+import argparse
+
+from common import setup_django, summarize, test_database, timeit
+
+HASHERS = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'api.hashers.TunedScryptPasswordHasher',
+    'argon2': 'api.hashers.TunedArgon2PasswordHasher',
+}
+
+
+def run(hasher, logins):
+    from django.contrib.auth.models import User
+    from django.test import override_settings
+    from rest_framework.test import APIRequestFactory
+    from api.views import LoginView
+
+    with override_settings(PASSWORD_HASHERS=[hasher]):
+        User.objects.create_user(username='bench_user', password='bench_password')
+        view = LoginView.as_view()
+        factory = APIRequestFactory()
+
+        def login():
+            request = factory.post('/api/login/', {'username': 'bench_user', 'password': 'bench_password'})
+            response = view(request)
+            assert response.status_code == 200, response.data
+
+        try:
+            return summarize(timeit(login, logins))
+        finally:
+            User.objects.all().delete()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--logins', type=int, default=20)
+    parser.add_argument('--hashers', nargs='+', choices=HASHERS, default=list(HASHERS))
+    args = parser.parse_args()
+
+    setup_django()
+    print(f'{"hasher":>8} {"mean ms":>9} {"p95 ms":>9} {"logins/s/core":>14}')
+    with test_database():
+        for name in args.hashers:
+            try:
+                stats = run(HASHERS[name], args.logins)
+            except ValueError as error:
+                # argon2-cffi is not installed
+                print(f'{name:>8} skipped: {error}')
+                continue
+            print(f'{name:>8} {stats["mean"]:>9.2f} {stats["p95"]:>9.2f} {1000 / stats["mean"]:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Compare DRF's JSONRenderer/JSONParser with the orjson-based ORJSONRenderer/ORJSONParser.
+
+    python benchmarks/bench_renderers.py --tasks 1000 10000 100000
+
+Renders the payload of task/executor/ (TaskWithExecutorAPIView) for lists of
+each size, after checking that both renderers produce the same bytes, and parses
+a task/bulk-create/ request body of the same size.
+"""
+
+import argparse
+import io
+
+from common import seed, setup_django, summarize, test_database, timeit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--calls', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from api.models import Task
+    from api.parsers import ORJSONParser
+    from api.renderers import ORJSONRenderer
+    from api.serializers import TaskValuesSerializer
+
+    serializer = TaskValuesSerializer(undefined_executor=True)
+
+    print(f'{"tasks":>8} {"step":<7} {"json MB/s":>10} {"orjson MB/s":>12} {"json ms":>9} {"orjson ms":>10} {"speedup":>8}')
+    for size in args.tasks:
+        with test_database():
+            seed(size, users=max(size // 100, 10))
+            data = serializer.serialize(serializer.rows(Task.objects.order_by('id')))
+
+        body = JSONRenderer().render(data)
+        assert ORJSONRenderer().render(data) == body, 'The renderers disagree'
+        bulk_body = JSONRenderer().render([
+            {'name': task['name'], 'cost': task['cost'], 'deadline': task['deadline'], 'executor': None} for task in data
+        ])
+
+        steps = {
+            'render': (
+                lambda: JSONRenderer().render(data),
+                lambda: ORJSONRenderer().render(data),
+                len(body),
+            ),
+            'parse': (
+                lambda: JSONParser().parse(io.BytesIO(bulk_body)),
+                lambda: ORJSONParser().parse(io.BytesIO(bulk_body)),
+                len(bulk_body),
+            ),
+        }
+        for step, (slow, fast, length) in steps.items():
+            slow, fast = summarize(timeit(slow, args.calls)), summarize(timeit(fast, args.calls))
+            megabytes = length / 1e6
+            print(
+                f'{size:>8} {step:<7} {megabytes / slow["mean"] * 1000:>10.1f} {megabytes / fast["mean"] * 1000:>12.1f} '
+                f'{slow["mean"]:>9.1f} {fast["mean"]:>10.1f} {slow["mean"] / fast["mean"]:>7.1f}x'
+            )
+
+
+if __name__ == '__main__':
+    main()
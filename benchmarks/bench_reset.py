@@ -0,0 +1,63 @@
+"""
+Compare clearing the database with QuerySet.delete() and with reset_database().
+
+    python benchmarks/bench_reset.py --tasks 10000 100000 1000000
+
+For every table size the database is seeded, then cleared once by each path;
+the duration and the peak of Python memory allocated during the reset (measured
+in a separate run, as tracing slows allocations down) are printed.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from common import seed, setup_django, test_database
+
+
+def orm_delete():
+    from django.contrib.auth.models import User
+    from api.models import Task
+    Task.objects.all().delete()
+    User.objects.all().delete()
+
+
+def fast_reset():
+    from api.reset import reset_database
+    reset_database()
+
+
+def measure(reset, tasks, users):
+    from api.models import Task
+
+    seed(tasks, users)
+    start = time.perf_counter()
+    reset()
+    duration = (time.perf_counter() - start) * 1000
+    assert not Task.objects.exists()
+
+    seed(tasks, users)
+    tracemalloc.start()
+    reset()
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return duration, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, nargs='+', default=[10000])
+    parser.add_argument('--users', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    print(f'{"tasks":>10} {"delete() ms":>12} {"MiB":>8} {"reset ms":>10} {"MiB":>8} {"speedup":>8}')
+    with test_database():
+        for tasks in args.tasks:
+            slow, slow_peak = measure(orm_delete, tasks, args.users)
+            quick, quick_peak = measure(fast_reset, tasks, args.users)
+            print(f'{tasks:>10} {slow:>12.1f} {slow_peak:>8.1f} {quick:>10.1f} {quick_peak:>8.2f} {slow / quick:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Compare TaskSerializer with the TaskValuesSerializer fast path on a large task list.
+
+    python benchmarks/bench_serializers.py --tasks 100000
+
+The script checks that both render identical JSON, then times the serialization
+step alone and the whole fetch + serialize + render path of a list view.
+"""
+
+import argparse
+
+from common import seed, setup_django, summarize, test_database, timeit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=100000)
+    parser.add_argument('--calls', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+    from api.models import Task
+    from api.serializers import TaskSerializer, TaskValuesSerializer
+
+    renderer = JSONRenderer()
+    tasks = Task.objects.order_by('id')
+    fast = TaskValuesSerializer()
+
+    with test_database():
+        seed(args.tasks, users=1000)
+        instances, rows = list(tasks), list(fast.rows(tasks))
+        assert renderer.render(TaskSerializer(instances, many=True).data) == renderer.render(fast.serialize(rows)), \
+            'The serializers disagree'
+
+        # Serialization only, from rows that were already fetched
+        results = {
+            'serialize': (
+                summarize(timeit(lambda: TaskSerializer(instances, many=True).data, args.calls)),
+                summarize(timeit(lambda: fast.serialize(rows), args.calls)),
+            ),
+            # Fetch, serialize and render, as a list view does
+            'fetch + serialize + render': (
+                summarize(timeit(lambda: renderer.render(TaskSerializer(tasks.all(), many=True).data), args.calls)),
+                summarize(timeit(lambda: renderer.render(fast.serialize(fast.rows(tasks.all()))), args.calls)),
+            ),
+        }
+
+    print(f'{"step":<28} {"TaskSerializer ms":>18} {"TaskValuesSerializer ms":>24} {"speedup":>8}')
+    for step, (slow, quick) in results.items():
+        print(f'{step:<28} {slow["mean"]:>18.1f} {quick["mean"]:>24.1f} {slow["mean"] / quick["mean"]:>7.1f}x')
+    print(f'{args.tasks} tasks, identical JSON')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark UserTasksStatsAPIView against growing task tables.
+
+    python benchmarks/bench_user_tasks_stats.py --tasks 10000 100000 1000000
+
+For every table size the stats of one user are requested repeatedly; the
+number of queries per call and the per-call latency are printed.
+"""
+
+import argparse
+
+from common import seed, setup_django, summarize, test_database, timeit
+
+
+def run(tasks, users, calls):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIRequestFactory, force_authenticate
+    from api.views import UserTasksStatsAPIView
+
+    with test_database():
+        user = seed(tasks, users)[0]
+        view = UserTasksStatsAPIView.as_view()
+        factory = APIRequestFactory()
+
+        def call():
+            request = factory.get('/api/user-tasks-stats/')
+            force_authenticate(request, user=user)
+            response = view(request)
+            assert response.status_code == 200, response.data
+
+        with CaptureQueriesContext(connection) as queries:
+            call()
+        return len(queries), summarize(timeit(call, calls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, nargs='+', default=[1000000])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--calls', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    print(f'{"tasks":>10} {"queries":>8} {"mean ms":>9} {"p50 ms":>9} {"p95 ms":>9} {"max ms":>9}')
+    for tasks in args.tasks:
+        queries, stats = run(tasks, args.users, args.calls)
+        print(f'{tasks:>10} {queries:>8} {stats["mean"]:>9.2f} {stats["p50"]:>9.2f} {stats["p95"]:>9.2f} {stats["max"]:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Compare the throughput of the sync task lists under WSGI with their async versions under ASGI.
+
+Start both servers on the same database first, with the response cache off (the
+default: only the sync lists use it, so with RESPONSE_CACHE_BACKEND=file the WSGI
+numbers would be cache hits), for example:
+
+    cd project
+    gunicorn project.wsgi -w 4 -b 127.0.0.1:8000 --threads 8
+    uvicorn project.asgi:application --workers 4 --port 8001
+
+then run:
+
+    python benchmarks/bench_wsgi_vs_asgi.py --wsgi-url http://127.0.0.1:8000/api/ \\
+        --asgi-url http://127.0.0.1:8001/api/ --concurrency 50 200 500
+"""
+
+import argparse
+import uuid
+
+import requests
+
+from loadgen import run_load
+
+# Sync endpoint -> its async version
+ENDPOINTS = {
+    'tasks-created-by-user/': 'async/tasks-created-by-user/',
+    'task/executor/': 'async/task/executor/',
+    'user-tasks/': 'async/user-tasks/',
+    'unassigned-tasks/': 'async/unassigned-tasks/',
+}
+
+
+def prepare(base_url, tasks):
+    """
+    Create a user with `tasks` tasks, half of them unassigned, and return its auth headers.
+    """
+    username, password = f'bench_{uuid.uuid4().hex[:12]}', uuid.uuid4().hex
+    for name in (username, username + '_executor'):
+        response = requests.post(base_url + 'user/create/', data={
+            'username': name, 'password': password, 'email': f'{name}@example.com'
+        })
+        response.raise_for_status()
+    executor_id = response.json()['id']
+
+    response = requests.post(base_url + 'login/', data={'username': username, 'password': password})
+    response.raise_for_status()
+    headers = {'Authorization': f'Token {response.json()["token"]}'}
+
+    batch = [
+        {'name': f'Task {i}', 'cost': i % 1000, 'deadline': '2030-01-01', 'executor': executor_id if i % 2 else None}
+        for i in range(tasks)
+    ]
+    response = requests.post(base_url + 'task/bulk-create/', json=batch, headers=headers)
+    response.raise_for_status()
+    return headers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--wsgi-url', required=True)
+    parser.add_argument('--asgi-url', required=True)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 200])
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--tasks', type=int, default=100)
+    args = parser.parse_args()
+
+    headers = prepare(args.wsgi_url, args.tasks)
+    print(f'{"endpoint":<28} {"server":<5} {"conc":>5} {"req/s":>9} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7}')
+    for concurrency in args.concurrency:
+        for sync_path, async_path in ENDPOINTS.items():
+            for server, url in (('wsgi', args.wsgi_url + sync_path), ('asgi', args.asgi_url + async_path)):
+                result = run_load(url, concurrency=concurrency, duration=args.duration, headers=headers)
+                print(
+                    f'{sync_path:<28} {server:<5} {concurrency:>5} {result["rps"]:>9.1f} '
+                    f'{result.get("p50", 0):>8.1f} {result.get("p95", 0):>8.1f} {result.get("p99", 0):>8.1f} '
+                    f'{result["errors"]:>7}'
+                )
+
+
+if __name__ == '__main__':
+    main()
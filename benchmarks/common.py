@@ -0,0 +1,70 @@
+"""
+Shared helpers for the benchmark scripts.
+
+The scripts run against a throwaway test database (in memory for SQLite), so the
+development database is never touched.
+"""
+
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'project')
+
+
+def setup_django():
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database(name=None):
+    """
+    Create a throwaway test database for the duration of the block. SQLite test
+    databases live in memory unless `name` gives a file, which several threads
+    can share, as a server does.
+    """
+    from django.db import connection
+    old_name = connection.settings_dict['NAME']
+    if name is not None:
+        connection.settings_dict['TEST']['NAME'] = name
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed(tasks, users, batch_size=10000, seed=0):
+    """
+    Create `users` users and `tasks` tasks with random creators, executors,
+    costs, statuses and deadlines. Returns the list of users.
+    """
+    from api.management.commands.seed_tasks import seed_tasks
+    return seed_tasks(tasks, users, batch_size=batch_size, seed=seed)
+
+
+def timeit(func, calls):
+    """
+    Call `func` `calls` times and return the durations in milliseconds.
+    """
+    durations = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def summarize(durations):
+    durations = sorted(durations)
+    return {
+        'mean': statistics.fmean(durations),
+        'p50': durations[len(durations) // 2],
+        'p95': durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+        'max': durations[-1],
+    }
@@ -0,0 +1,76 @@
+"""
+A small concurrent HTTP load generator.
+
+Every worker thread keeps one keep-alive session and sends requests back to back
+until the duration is over; latencies are collected per request.
+"""
+
+import threading
+import time
+
+import requests
+
+from common import summarize
+
+
+def percentile(durations, fraction):
+    durations = sorted(durations)
+    return durations[min(len(durations) - 1, int(len(durations) * fraction))]
+
+
+def run_load(url, concurrency=50, duration=10.0, method='GET', headers=None, expect=None, **kwargs):
+    """
+    Hammer `url` with `concurrency` workers for `duration` seconds. `url` and the
+    requests arguments in `kwargs` (e.g. `json`) may be callables returning the value
+    for each request; they are called outside of the timing. Responses for which `expect(status)`
+    is false count as errors (by default, statuses from 400 on).
+    Returns a dict with the request and error counts, requests/s and latency percentiles in ms.
+    """
+    expect = expect or (lambda status: status < 400)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    start_event = threading.Event()
+
+    def worker():
+        session = requests.Session()
+        session.headers.update(headers or {})
+        own_latencies, own_errors = [], 0
+        start_event.wait()
+        while time.perf_counter() < deadline:
+            target = url() if callable(url) else url
+            arguments = {name: value() if callable(value) else value for name, value in kwargs.items()}
+            started = time.perf_counter()
+            try:
+                response = session.request(method, target, **arguments)
+                response.content
+                ok = expect(response.status_code)
+            except requests.RequestException:
+                ok = False
+            own_latencies.append((time.perf_counter() - started) * 1000)
+            own_errors += not ok
+        with lock:
+            latencies.extend(own_latencies)
+            errors.append(own_errors)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    began = time.perf_counter()
+    deadline = began + duration
+    start_event.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    result = {
+        'url': url if isinstance(url, str) else getattr(url, '__name__', repr(url)),
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'rps': len(latencies) / elapsed,
+    }
+    if latencies:
+        result.update(summarize(latencies))
+        result['p99'] = percentile(latencies, 0.99)
+    return result
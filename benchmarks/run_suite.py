@@ -0,0 +1,334 @@
+"""
+Load-test every task API endpoint and save the results for later comparison.
+
+By default the suite runs in-process: for every --tasks size it seeds a throwaway
+SQLite file with that many tasks and --users users, serves the project from a
+threaded WSGI server in this process, and drives each endpoint in turn:
+
+    python benchmarks/run_suite.py --tasks 10000 100000 1000000 --save results.json
+
+It can also drive a server that is already running, seeded beforehand with
+
+    python manage.py seed_tasks --tasks 100000 --users 1000 --password benchmark --tokens tokens.json
+
+and then
+
+    python benchmarks/run_suite.py --url http://127.0.0.1:8000/api/ --tokens project/tokens.json \\
+        --password benchmark --save results.json
+
+The task lists are measured without the response cache (api/response_cache.py),
+which is off by default; --response-cache turns it on in-process, where most list
+requests are then cache hits. Against a running server it depends on how that
+server is configured.
+
+--compare prints the change of requests/s and p95 latency against saved results
+and exits with status 1 when an endpoint regressed by more than --threshold percent.
+In-process, the time taken to clear each seeded database is reported as well.
+In-process the load generator and the server share one interpreter, so the
+absolute numbers are lower than against a separate server; compare runs made the
+same way.
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import requests
+
+from common import PROJECT_DIR, setup_django, test_database
+from loadgen import run_load
+
+PASSWORD = 'benchmark'
+
+
+@contextmanager
+def local_server():
+    """
+    Serve the project from a threaded WSGI server on a free port; yields the API base URL.
+    """
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        # Headers and body are separate writes: with Nagle's algorithm on, every
+        # keep-alive response waits for the client's delayed ACK (~40 ms)
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler, allow_reuse_address=False)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_port}/api/'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def cycle_urls(base_url, path, task_ids):
+    """
+    Return a callable giving `path` formatted with the next task ID, round and round.
+    """
+    task_ids = itertools.cycle(task_ids or [0])
+    lock = threading.Lock()
+
+    def url():
+        with lock:
+            return base_url + path.format(next(task_ids))
+    return url
+
+
+def cycle_batches(task_ids, size):
+    """
+    Return a callable giving the body of a batch endpoint for the next `size` task IDs, round and round.
+    """
+    task_ids = task_ids or [0]
+    batches = itertools.cycle([task_ids[i:i + size] for i in range(0, len(task_ids), size)])
+    lock = threading.Lock()
+
+    def body():
+        with lock:
+            return {'ids': next(batches)}
+    return body
+
+
+def new_users(password):
+    """
+    Return a callable giving the body of a user/create/ request for a new user.
+    """
+    prefix = f'load_{time.monotonic_ns():x}'
+    numbers = itertools.count()
+    lock = threading.Lock()
+
+    def body():
+        with lock:
+            username = f'{prefix}_{next(numbers)}'
+        return {'username': username, 'password': password, 'email': f'{username}@example.com'}
+    return body
+
+
+def endpoints(base_url, users, password, batch_size=100):
+    """
+    Return {name: run_load() arguments} for every endpoint, read-only ones first.
+
+    Left out: logout/, which needs a token from a new login for every call, so the
+    password hash of login (measured on its own) would be most of its time, and the
+    task/events/ stream, which stays open under ASGI (its WSGI form is a long-poll,
+    measured with task/events/poll/).
+    """
+    user, claimer = users[0], users[1]
+    headers = {'Authorization': f'Token {user["token"]}'}
+    claimer_headers = {'Authorization': f'Token {claimer["token"]}'}
+
+    # The tasks the claimer may take, one by one and in batches, and the tasks the first user may mark as done
+    unassigned = requests.get(base_url + 'unassigned-tasks/', headers=headers).json()
+    claimable = [task['id'] for task in unassigned if task['creator'] != claimer['id']]
+    assigned = [task['id'] for task in requests.get(base_url + 'user-tasks/', headers=headers).json()]
+    # A cursor with nothing after it, as a client that is up to date polls with
+    cursors = {
+        path: requests.get(base_url + path, headers=headers).json()['cursor']
+        for path in ('task/executor/changes/', 'tasks-created-by-user/changes/')
+    }
+
+    return {
+        'tasks-created-by-user': {'url': base_url + 'tasks-created-by-user/', 'headers': headers},
+        'tasks-created-by-user (page)': {'url': base_url + 'tasks-created-by-user/?page_size=100', 'headers': headers},
+        'task/executor': {'url': base_url + 'task/executor/'},
+        'task/executor (page)': {'url': base_url + 'task/executor/?page_size=100'},
+        'user-tasks': {'url': base_url + 'user-tasks/', 'headers': headers},
+        'unassigned-tasks': {'url': base_url + 'unassigned-tasks/', 'headers': headers},
+        'user-tasks-stats': {'url': base_url + 'user-tasks-stats/', 'headers': headers},
+        # The async lists only take token authentication
+        'async/tasks-created-by-user': {'url': base_url + 'async/tasks-created-by-user/', 'headers': headers},
+        'async/task/executor': {'url': base_url + 'async/task/executor/', 'headers': headers},
+        'async/user-tasks': {'url': base_url + 'async/user-tasks/', 'headers': headers},
+        'async/unassigned-tasks': {'url': base_url + 'async/unassigned-tasks/', 'headers': headers},
+        **{
+            path.rstrip('/'): {'url': f'{base_url}{path}?since={cursor}', 'headers': headers}
+            for path, cursor in cursors.items()
+        },
+        'task/events/poll': {'url': base_url + 'task/events/poll/?timeout=0', 'headers': headers},
+        'login': {
+            'url': base_url + 'login/', 'method': 'POST',
+            'data': {'username': user['username'], 'password': password},
+        },
+        'user/create': {'url': base_url + 'user/create/', 'method': 'POST', 'data': new_users(password)},
+        'task/create': {
+            'url': base_url + 'task/create/', 'method': 'POST', 'headers': headers,
+            'json': {'name': 'Load test task', 'cost': 100, 'deadline': '2030-01-01'},
+        },
+        f'task/bulk-create ({batch_size})': {
+            'url': base_url + 'task/bulk-create/', 'method': 'POST', 'headers': headers,
+            'json': [{'name': f'Load test task {i}', 'cost': 100, 'deadline': '2030-01-01'} for i in range(batch_size)],
+        },
+        'mark-task-done': {
+            'url': cycle_urls(base_url, 'mark-task-done/{}/', assigned), 'method': 'PATCH', 'headers': headers,
+        },
+        f'task/bulk-mark-done ({batch_size})': {
+            'url': base_url + 'task/bulk-mark-done/', 'method': 'PATCH', 'headers': headers,
+            'json': cycle_batches(assigned, batch_size),
+        },
+        # Every task can only be claimed once: "already has an executor" is an expected answer
+        'become-executor': {
+            'url': cycle_urls(base_url, 'become-executor/{}/', claimable[::2]), 'method': 'PATCH',
+            'headers': claimer_headers, 'expect': lambda status: status in (200, 400),
+        },
+        f'task/bulk-become-executor ({batch_size})': {
+            'url': base_url + 'task/bulk-become-executor/', 'method': 'PATCH', 'headers': claimer_headers,
+            'json': cycle_batches(claimable[1::2], batch_size),
+        },
+    }
+
+
+def run_endpoints(base_url, users, password, args):
+    results = {}
+    for name, kwargs in endpoints(base_url, users, password).items():
+        if args.endpoints and name not in args.endpoints:
+            continue
+        result = run_load(concurrency=args.concurrency, duration=args.duration, **kwargs)
+        result.pop('url')
+        results[name] = result
+        print(
+            f'{name:<32} {result["rps"]:>9.1f} {result.get("p50", 0):>8.1f} {result.get("p95", 0):>8.1f} '
+            f'{result.get("p99", 0):>8.1f} {result["requests"]:>8} {result["errors"]:>7}'
+        )
+    return results
+
+
+def run_in_process(size, args):
+    from rest_framework.authtoken.models import Token
+    from api.management.commands.seed_tasks import seed_tasks
+    from api.reset import reset_database
+    from api.response_cache import response_cache
+
+    # The in-memory cache is right here: the server is this one process
+    response_cache.enabled = args.response_cache
+
+    with tempfile.TemporaryDirectory() as directory, test_database(f'{directory}/benchmark.sqlite3'):
+        seed_tasks(size, args.users, password=PASSWORD, seed=args.seed)
+        users = [
+            {'id': user_id, 'username': username, 'token': key}
+            for user_id, username, key in Token.objects.order_by('user_id').values_list('user_id', 'user__username', 'key')[:2]
+        ]
+        with local_server() as base_url:
+            results = run_endpoints(base_url, users, PASSWORD, args)
+
+        # Clearing the seeded database, as clear_db/ does
+        start = time.perf_counter()
+        reset_database()
+        results['clear_db'] = {'ms': (time.perf_counter() - start) * 1000}
+        print(f'{"clear_db":<32} {results["clear_db"]["ms"]:>9.1f} ms')
+        return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the change of every endpoint against `baseline`; return the regressions.
+    """
+    regressions = []
+    print(f'\n{"size":<10} {"endpoint":<32} {"req/s":>9} {"change":>8} {"p95 ms":>8} {"change":>8}')
+    for size, endpoints_results in results.items():
+        for name, result in endpoints_results.items():
+            old = baseline.get(size, {}).get(name)
+            if old and 'ms' in result and 'ms' in old:
+                change = (result['ms'] - old['ms']) / old['ms'] * 100
+                regressed = change > threshold
+                if regressed:
+                    regressions.append((size, name))
+                print(f'{size:<10} {name:<32} {"":>9} {"":>8} {result["ms"]:>8.1f} {change:>+7.1f}%'
+                      f'{"  REGRESSION" if regressed else ""}')
+                continue
+            if not old or 'p95' not in result or 'p95' not in old:
+                continue
+            rps_change = (result['rps'] - old['rps']) / old['rps'] * 100
+            p95_change = (result['p95'] - old['p95']) / old['p95'] * 100
+            regressed = rps_change < -threshold or p95_change > threshold
+            if regressed:
+                regressions.append((size, name))
+            print(
+                f'{size:<10} {name:<32} {result["rps"]:>9.1f} {rps_change:>+7.1f}% {result["p95"]:>8.1f} '
+                f'{p95_change:>+7.1f}%{"  REGRESSION" if regressed else ""}'
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, nargs='+', default=[10000, 100000], help='Data volumes, in-process only')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--url', help='Base URL of a running, seeded server, e.g. http://127.0.0.1:8000/api/')
+    parser.add_argument('--tokens', help='Tokens file written by "manage.py seed_tasks --tokens", with --url')
+    parser.add_argument('--password', default=PASSWORD, help='Password of the seeded users, with --url')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per endpoint')
+    parser.add_argument('--endpoints', nargs='+', help='Only run these endpoints')
+    parser.add_argument('--response-cache', action='store_true', help='Serve the task lists from the response cache, in-process only')
+    parser.add_argument('--save', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Compare with the results saved in this JSON file')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Regression threshold in percent')
+    args = parser.parse_args()
+    if args.url and not args.tokens:
+        parser.error('--url needs --tokens')
+    if args.url and args.response_cache:
+        parser.error('--response-cache is set by the configuration of the server with --url')
+
+    header = f'{"endpoint":<32} {"req/s":>9} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"requests":>8} {"errors":>7}'
+    results = {}
+    if args.url:
+        with open(args.tokens) as f:
+            users = json.load(f)
+        print(f'\n{args.url}\n{header}')
+        results['server'] = run_endpoints(args.url, users, args.password, args)
+    else:
+        setup_django()
+        for size in args.tasks:
+            print(f'\n{size} tasks, {args.users} users\n{header}')
+            results[str(size)] = run_in_process(size, args)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'meta': {
+                    'date': datetime.now(timezone.utc).isoformat(),
+                    'commit': git_commit(),
+                    'python': platform.python_version(),
+                    'mode': 'server' if args.url else 'in-process',
+                    'users': args.users,
+                    'concurrency': args.concurrency,
+                    'duration': args.duration,
+                    'response_cache': args.response_cache if not args.url else None,
+                },
+                'results': results,
+            }, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)['results'], args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} regressions over {args.threshold}%')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Register the signal handlers
+        from . import signals  # noqa: F401
+        from .db_routers import check_pin_cache
+        check_pin_cache()
@@ -0,0 +1,223 @@
+"""
+Async versions of the read-only task lists, for deployments served through project/asgi.py.
+
+They use Django's async ORM instead of DRF (whose views are synchronous), so
+under ASGI a request never leaves the event loop. The responses are the same
+as the ones of the DRF views they mirror.
+
+The task event endpoints (see events.py) are async too, so that a waiting
+subscriber holds no thread under ASGI.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.authentication import get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+
+from .authentication import token_cache
+from .events import Subscription, broker
+from .models import Task
+from .renderers import dumps
+from .serializers import TaskEventsQuerySerializer, TaskListQuerySerializer, TaskValuesSerializer
+
+__all__ = [
+    'AsyncTasksCreatedByUser',
+    'AsyncTaskWithExecutorAPIView',
+    'AsyncUserTasksAPIView',
+    'AsyncUnassignedTasksAPIView',
+    'TaskEventStreamView',
+    'TaskEventPollView',
+]
+
+
+async def authenticate(request):
+    """
+    Async counterpart of CachedTokenAuthentication: returns the user of the
+    `Authorization: Token <key>` header, sharing the same token cache.
+    """
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != b'token':
+        raise NotAuthenticated()
+    if len(auth) != 2:
+        raise AuthenticationFailed('Invalid token header.')
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        raise AuthenticationFailed('Invalid token header. Token string should not contain invalid characters.')
+
+    cached = token_cache.get(key)
+    if cached is not None:
+        return cached[0]
+
+    generation = token_cache.generation
+    try:
+        token = await Token.objects.select_related('user').aget(key=key)
+    except Token.DoesNotExist:
+        raise AuthenticationFailed('Invalid token.')
+    if not token.user.is_active:
+        raise AuthenticationFailed('User inactive or deleted.')
+
+    token_cache.set(key, token.user, token, generation)
+    return token.user
+
+
+def unauthorized(detail):
+    response = HttpResponse(dumps({'detail': detail}), content_type='application/json', status=401)
+    response['WWW-Authenticate'] = 'Token'
+    return response
+
+
+class AsyncTaskListView(View):
+    """
+    Base class of the async task lists. Subclasses implement get_queryset(user).
+    """
+    http_method_names = ['get', 'head', 'options']
+    login_required = True
+    undefined_executor = False  # Replace a missing executor with "undefined"
+    chunk_size = 2000
+
+    async def get(self, request):
+        user = None
+        if self.login_required:
+            try:
+                user = await authenticate(request)
+            except (AuthenticationFailed, NotAuthenticated) as exc:
+                return unauthorized(exc.detail)
+
+        query = TaskListQuerySerializer(data=request.GET)
+        if not query.is_valid():
+            return HttpResponse(dumps(query.errors), content_type='application/json', status=400)
+        serializer = TaskValuesSerializer(
+            undefined_executor=self.undefined_executor,
+            expand=query.validated_data.get('expand', ()),
+            fields=query.validated_data.get('fields'),
+        )
+        rows = serializer.rows(self.get_queryset(user))
+        data = [serializer.to_representation(row) async for row in rows.aiterator(chunk_size=self.chunk_size)]
+        return HttpResponse(dumps(data), content_type='application/json')
+
+    def get_queryset(self, user):
+        raise NotImplementedError
+
+
+class AsyncTasksCreatedByUser(AsyncTaskListView):
+
+    def get_queryset(self, user):
+        return Task.objects.filter(creator=user)
+
+
+class AsyncTaskWithExecutorAPIView(AsyncTaskListView):
+    login_required = False
+    undefined_executor = True
+
+    def get_queryset(self, user):
+        return Task.objects.all()
+
+
+class AsyncUserTasksAPIView(AsyncTaskListView):
+
+    def get_queryset(self, user):
+        return Task.objects.filter(executor=user).order_by('id')
+
+
+class AsyncUnassignedTasksAPIView(AsyncTaskListView):
+
+    def get_queryset(self, user):
+        return Task.objects.filter(executor__isnull=True).order_by('cost', 'id')
+
+
+class TaskEventView(View):
+    """
+    Base class of the task event endpoints: authenticates the user and opens the
+    Subscription asked for by the query parameters, see TaskEventsQuerySerializer.
+    """
+    http_method_names = ['get', 'options']
+
+    async def get(self, request):
+        try:
+            user = await authenticate(request)
+        except (AuthenticationFailed, NotAuthenticated) as exc:
+            return unauthorized(exc.detail)
+
+        query = TaskEventsQuerySerializer(data=request.GET)
+        if not query.is_valid():
+            return HttpResponse(dumps(query.errors), content_type='application/json', status=400)
+
+        cursor = query.validated_data.get('cursor', request.headers.get('Last-Event-ID'))
+        subscription = Subscription(broker, user.pk, query.validated_data['filter'], cursor)
+        timeout = query.validated_data.get('timeout', settings.TASK_EVENTS['POLL_SECONDS'])
+        return await self.respond(request, subscription, timeout)
+
+    async def respond(self, request, subscription, timeout):
+        raise NotImplementedError
+
+
+class TaskEventPollView(TaskEventView):
+    """
+    Long-poll: waits up to ?timeout= seconds for matching events and returns
+    {"reset": ..., "cursor": ..., "events": [...]}. The client asks again with
+    ?cursor= set to the cursor it got.
+    """
+
+    async def respond(self, request, subscription, timeout):
+        events = await subscription.next(timeout)
+        data = {'reset': subscription.reset, 'cursor': subscription.cursor, 'events': events}
+        return HttpResponse(dumps(data), content_type='application/json')
+
+
+class TaskEventStreamView(TaskEventView):
+    """
+    Server-sent events: one "created", "claimed" or "done" event per task event,
+    with the task as data and the cursor as id, and a "reset" event when the
+    client's lists must be downloaded again. EventSource sends the last id back in
+    Last-Event-ID when it reconnects.
+
+    Under ASGI the stream stays open for TASK_EVENTS['STREAM_SECONDS']. A WSGI
+    server would buffer it whole, so there the response ends with the first
+    events, as a long-poll in the event-stream format.
+    """
+
+    async def respond(self, request, subscription, timeout):
+        if not isinstance(request, ASGIRequest):
+            chunks = [chunk async for chunk in self.stream(subscription, timeout, once=True)]
+            response = HttpResponse(b''.join(chunks), content_type='text/event-stream')
+        else:
+            response = StreamingHttpResponse(
+                self.stream(subscription, settings.TASK_EVENTS['STREAM_SECONDS']), content_type='text/event-stream',
+            )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Tell nginx not to buffer the stream
+        return response
+
+    async def stream(self, subscription, duration, once=False):
+        # The id sets the client's Last-Event-ID before any event arrives
+        yield f'retry: {settings.TASK_EVENTS["RETRY_MILLISECONDS"]}\nid: {subscription.cursor}\n\n'.encode()
+        end = time.monotonic() + duration
+        while True:
+            remaining = max(end - time.monotonic(), 0)
+            wait = remaining if once else min(remaining, settings.TASK_EVENTS['KEEPALIVE_SECONDS'])
+            events = await subscription.next(wait)
+            if subscription.reset:
+                subscription.reset = False
+                yield self.message('reset', {}, subscription.cursor)
+            elif events:
+                # Only the last event carries the cursor: a client cut off in the
+                # middle gets the first ones again rather than missing the others
+                for event in events[:-1]:
+                    yield self.message(event['type'], event['task'])
+                yield self.message(events[-1]['type'], events[-1]['task'], subscription.cursor)
+            elif not once:
+                yield f': keepalive\nid: {subscription.cursor}\n\n'.encode()
+            if once or time.monotonic() >= end:
+                break
+
+    def message(self, event_type, data, cursor=None):
+        message = f'event: {event_type}\ndata: {dumps(data)}\n'
+        if cursor is not None:
+            message += f'id: {cursor}\n'
+        return (message + '\n').encode()
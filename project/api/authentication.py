@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    """
+    Bounded in-process LRU of token key -> (user, token) entries with a time-to-live.
+
+    When `cache_alias` is set, entries are stored in that Django cache instead, so that
+    processes share them and an evicted token (logout, deleted or deactivated user)
+    stops authenticating in every process at once: a local copy could outlive the
+    eviction by up to `ttl` seconds in the other processes.
+    """
+    key_prefix = 'auth-token'
+
+    def __init__(self, max_size=10000, ttl=300, cache_alias=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every eviction so that lookups racing with a logout are not cached
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    def shared_key(self, key):
+        # The epoch is bumped by clear(), which orphans every shared entry at once
+        epoch = self.shared.get_or_set(f'{self.key_prefix}:epoch', 0, None)
+        return f'{self.key_prefix}:{epoch}:{key}'
+
+    def get(self, key):
+        if self.shared is not None:
+            value = self.shared.get(self.shared_key(key))
+            with self._lock:
+                if value is not None:
+                    self.shared_hits += 1
+                else:
+                    self.misses += 1
+            return value
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+        return None
+
+    def set(self, key, user, token, generation):
+        """
+        Cache a token loaded from the database. `generation` is the value of
+        self.generation read before the lookup; the entry is dropped if a token
+        was evicted in the meantime.
+        """
+        if generation != self.generation:
+            return
+        if self.shared is not None:
+            self.shared.set(self.shared_key(key), (user, token), self.ttl)
+        else:
+            self._store(key, user, token)
+
+    def _store(self, key, user, token):
+        with self._lock:
+            self._entries[key] = (user, token, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete(self.shared_key(key))
+
+    def delete_user(self, user_id):
+        with self._lock:
+            self.generation += 1
+            for key in [key for key, entry in self._entries.items() if entry[0].pk == user_id]:
+                del self._entries[key]
+        if self.shared is not None:
+            keys = Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+            self.shared.delete_many([self.shared_key(key) for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+        if self.shared is not None:
+            try:
+                self.shared.incr(f'{self.key_prefix}:epoch')
+            except ValueError:
+                self.shared.set(f'{self.key_prefix}:epoch', 1, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+            }
+
+
+token_cache = TokenCache(
+    max_size=settings.TOKEN_AUTH_CACHE['MAX_SIZE'],
+    ttl=settings.TOKEN_AUTH_CACHE['TTL'],
+    cache_alias=settings.TOKEN_AUTH_CACHE['CACHE_ALIAS'],
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that resolves tokens through `token_cache`, so the
+    token/user join only runs on a cache miss.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+
+        generation = token_cache.generation
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user, token, generation)
+        return user, token
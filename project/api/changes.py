@@ -0,0 +1,120 @@
+"""
+Change feed of the tasks.
+
+Every write path records the IDs of the tasks it changed in TaskChange, in the
+same transaction; the id of a TaskChange row is the change sequence. A client
+that mirrors a task list keeps the sequence it has synced up to (its cursor) and
+asks for the changes after it: every task changed since is sent once, in its
+current state, or as a tombstone ({"id": ..., "deleted": true}) when it no
+longer exists. Syncing costs in proportion to the number of changes, not tasks.
+
+Clearing or seeding the database and pruning old changes insert reset markers,
+rows without a task: a client whose cursor is older is told to download the
+list again, then to follow the feed from the cursor sent with the reset. So is a
+client whose cursor is newer than the last change, e.g. after a database restore.
+
+Sequence numbers are allocated when a row is inserted, not when its transaction
+commits, so on PostgreSQL a change can become visible after a higher one. The
+cursor given to clients therefore never passes a change younger than
+TASK_CHANGES['SETTLE_SECONDS']: those are sent again by the next call, which is
+harmless as the feed carries states rather than differences. SQLite serializes
+writers, so there the window could be 0.
+"""
+
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from .models import Task, TaskChange
+from .serializers import TaskValuesSerializer
+
+ChangePage = namedtuple('ChangePage', 'reset cursor changes more')
+
+
+def record_changes(task_ids):
+    TaskChange.objects.bulk_create([TaskChange(task_id=task_id) for task_id in task_ids])
+
+
+def record_deletion(task):
+    TaskChange.objects.create(task_id=task.pk, creator_id=task.creator_id)
+
+
+def record_reset():
+    TaskChange.objects.create()
+
+
+def prune_changes(before):
+    """
+    Delete the changes recorded before `before`, leaving a reset marker in place
+    of the last one for the clients that had not synced up to it. Returns the
+    number of changes deleted.
+    """
+    with transaction.atomic():
+        last = TaskChange.objects.filter(created_at__lt=before).aggregate(last=Max('id'))['last']
+        if last is None:
+            return 0
+        deleted, _ = TaskChange.objects.filter(id__lte=last).delete()
+        TaskChange.objects.create(id=last)
+    return deleted
+
+
+def read_changes(since, creator_id=None, undefined_executor=False, limit=None, settle=None):
+    """
+    Return the ChangePage of the changes after cursor `since` (None for a new
+    client) of all tasks, or of the tasks created by `creator_id`. Each change
+    is the representation TaskValuesSerializer gives the task, or a tombstone.
+    """
+    limit = limit or settings.TASK_CHANGES['PAGE_SIZE']
+    settle = settings.TASK_CHANGES['SETTLE_SECONDS'] if settle is None else settle
+    cutoff = timezone.now() - timedelta(seconds=settle)
+
+    # One query over the unread part of the log, whatever the creator
+    bounds = TaskChange.objects.filter(id__gt=since or 0).aggregate(
+        last=Max('id'),
+        last_reset=Max('id', filter=Q(task__isnull=True)),
+        first_unsettled=Min('id', filter=Q(created_at__gt=cutoff)),
+    )
+
+    def settled(upper):
+        # The cursor may pass every change up to `upper` but the unsettled ones
+        if bounds['first_unsettled'] is not None:
+            upper = min(upper, bounds['first_unsettled'] - 1)
+        return max(upper, since or 0)
+
+    if since is None or bounds['last_reset'] is not None:
+        return ChangePage(reset=True, cursor=settled(bounds['last'] or 0), changes=[], more=False)
+    if bounds['last'] is None and since:
+        # A cursor past the newest change comes from before a restore of the database or
+        # a restart of its sequence: the client would otherwise wait for it forever
+        newest = TaskChange.objects.aggregate(newest=Max('id'))['newest'] or 0
+        if since > newest:
+            first_unsettled = TaskChange.objects.filter(created_at__gt=cutoff).aggregate(first=Min('id'))['first']
+            cursor = newest if first_unsettled is None else min(newest, first_unsettled - 1)
+            return ChangePage(reset=True, cursor=cursor, changes=[], more=False)
+
+    changes = TaskChange.objects.filter(id__gt=since)
+    if creator_id is not None:
+        # Tasks that still exist are matched through their row, deleted ones by the tombstone
+        changes = changes.filter(Q(task__creator_id=creator_id) | Q(creator_id=creator_id))
+    rows = list(changes.order_by('id').values_list('id', 'task_id')[:limit])
+    upper = rows[-1][0] if len(rows) == limit else (bounds['last'] or since)
+    cursor = settled(upper)
+
+    # Every task once, where it changed last
+    task_ids = list({task_id: None for _, task_id in reversed(rows)})[::-1]
+    serializer = TaskValuesSerializer(undefined_executor=undefined_executor)
+    tasks = {row.id: row for row in serializer.rows(Task.objects.filter(pk__in=task_ids))}
+    return ChangePage(
+        reset=False,
+        cursor=cursor,
+        changes=[
+            serializer.to_representation(tasks[task_id]) if task_id in tasks else {'id': task_id, 'deleted': True}
+            for task_id in task_ids
+        ],
+        # More changes can be read right away, unless the cursor waits for some to settle
+        more=len(rows) == limit and cursor == upper,
+    )
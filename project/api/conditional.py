@@ -0,0 +1,57 @@
+"""
+Validators of the task list responses, for conditional GET requests.
+
+The ETag of a list is derived from the number of its tasks, their latest
+updated_at and the representation asked for (query parameters, media type).
+The first two are read with one aggregate query, answered from the
+(updated_at) and (creator, updated_at) indexes for the lists of all tasks and
+of a creator, before any task is loaded. Every change of a task sets its
+updated_at, so an insertion or an edit moves the maximum and a deletion changes
+the count: a request whose If-None-Match holds the current ETag gets
+304 Not Modified without the tasks being read or serialized.
+
+Last-Modified is sent too, but a deletion does not move it, so If-Modified-Since
+alone never produces a 304.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .response_cache import request_variant
+
+
+def list_validators(tasks):
+    """
+    Return (number of tasks, latest updated_at or None) of the `tasks` queryset.
+    """
+    validators = tasks.order_by().aggregate(count=Count('id'), last_modified=Max('updated_at'))
+    return validators['count'], validators['last_modified']
+
+
+def list_etag(request, count, last_modified):
+    stamp = last_modified.isoformat() if last_modified else ''
+    validator = f'{request_variant(request)}\n{count}\n{stamp}'
+    return '"%s"' % hashlib.md5(validator.encode(), usedforsecurity=False).hexdigest()
+
+
+def not_modified(request, etag, response=None):
+    """
+    Return the 304 (or 412) response `request` gets for `etag`, or None when the
+    full response must be sent.
+    """
+    conditional = get_conditional_response(request, etag=etag, response=response)
+    if conditional is response:
+        return None
+    if conditional is not None:
+        conditional['ETag'] = etag
+    return conditional
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
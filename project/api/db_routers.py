@@ -0,0 +1,169 @@
+"""
+Routing of read-only queries to read replicas.
+
+Views opt in with `replica_reads = True`; ReplicaRoutingMiddleware (api/middleware.py)
+then lets ReplicaRouter send the GET/HEAD queries of the models in
+REPLICA_ROUTING['MODELS'] to a replica. Everything else stays on the primary:
+writes, reads of other models (tokens and users are always read fresh), reads
+inside a transaction or after the request wrote, and all reads of a user who
+wrote in the last REPLICA_ROUTING['READ_YOUR_WRITES'] seconds.
+"""
+
+import itertools
+import math
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+# RoutingState of the request being handled, set by ReplicaRoutingMiddleware
+routing_state = ContextVar('replica_routing_state', default=None)
+
+
+def routing_setting(name):
+    return settings.REPLICA_ROUTING[name]
+
+
+def pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def request_user_id(request):
+    user = getattr(request, 'user', None)
+    # Don't load the session user of AuthenticationMiddleware just to route a query
+    if user is None or (isinstance(user, SimpleLazyObject) and user._wrapped is empty):
+        return None
+    return user.pk if user.is_authenticated else None
+
+
+class RoutingState:
+    """
+    Routing information of one request.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.replica_reads = False  # Set when the view allows replica reads
+        self.wrote = False
+        self._pinned = None
+
+    def pinned(self):
+        """
+        Whether the user of the request wrote recently and must read from the primary.
+        """
+        if self._pinned is None:
+            user_id = request_user_id(self.request)
+            if user_id is None:
+                return False
+            self._pinned = bool(caches[routing_setting('CACHE_ALIAS')].get(pin_key(user_id)))
+        return self._pinned
+
+    def pin(self):
+        user_id = request_user_id(self.request)
+        if user_id is not None and routing_setting('READ_YOUR_WRITES'):
+            caches[routing_setting('CACHE_ALIAS')].set(pin_key(user_id), True, routing_setting('READ_YOUR_WRITES'))
+
+
+def check_pin_cache():
+    """
+    Refuse to route reads to replicas when the read-your-writes pins are kept in
+    process memory: the next request of a user who wrote may go to another process,
+    which would not know about the pin.
+    """
+    alias = routing_setting('CACHE_ALIAS')
+    if routing_setting('REPLICAS') and isinstance(caches[alias], LocMemCache):
+        raise ImproperlyConfigured(
+            f"DATABASE_REPLICAS needs a cache shared by the processes for REPLICA_ROUTING['CACHE_ALIAS'], "
+            f"but {alias!r} is in memory: set CACHE_BACKEND=file or use another cache"
+        )
+
+
+def replica_lag(alias):
+    """
+    Return how many seconds `alias` is behind the primary, or infinity when it can't be reached.
+    """
+    connection = connections[alias]
+    try:
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                )
+                return float(cursor.fetchone()[0])
+        # Other backends have no replication to measure (SQLite copies are never behind)
+        connection.ensure_connection()
+        return 0.0
+    except DatabaseError:
+        return math.inf
+
+
+class ReplicaRouter:
+    """
+    Database router that spreads the replica reads over REPLICA_ROUTING['REPLICAS'],
+    either in turn ('round_robin') or to the replica that is the least behind
+    ('least_lag'). Replicas more than REPLICA_ROUTING['MAX_LAG'] seconds behind
+    are skipped; when none is left, reads go to the primary.
+    """
+
+    def __init__(self):
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._lags = {}
+        self._lags_checked = -math.inf
+
+    def db_for_read(self, model, **hints):
+        state = routing_state.get()
+        if state is None or not state.replica_reads or state.wrote or not routing_setting('REPLICAS'):
+            return None
+        if model._meta.label not in routing_setting('MODELS') or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        if state.pinned():
+            return None
+        return self.select_replica()
+
+    def db_for_write(self, model, **hints):
+        state = routing_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *routing_setting('REPLICAS')}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in routing_setting('REPLICAS'):
+            return False
+        return None
+
+    def select_replica(self):
+        lags = self.lags()
+        replicas = [alias for alias in routing_setting('REPLICAS') if lags.get(alias, 0.0) <= routing_setting('MAX_LAG')]
+        if not replicas:
+            return None
+        if routing_setting('SELECTION') == 'least_lag':
+            return min(replicas, key=lambda alias: lags.get(alias, 0.0))
+        return replicas[next(self._counter) % len(replicas)]
+
+    def lags(self):
+        """
+        Lag of every replica, measured at most every REPLICA_ROUTING['LAG_CHECK_INTERVAL'] seconds.
+        """
+        now = time.monotonic()
+        if now - self._lags_checked < routing_setting('LAG_CHECK_INTERVAL'):
+            return self._lags
+        with self._lock:
+            if now - self._lags_checked >= routing_setting('LAG_CHECK_INTERVAL'):
+                self._lags = {alias: replica_lag(alias) for alias in routing_setting('REPLICAS')}
+                self._lags_checked = now
+        return self._lags
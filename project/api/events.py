@@ -0,0 +1,175 @@
+"""
+Push notifications of task events, so executors need not poll unassigned-tasks/.
+
+Write paths call notify_tasks() when tasks are created, claimed or marked done;
+once the transaction commits the events are published to the broker, which
+keeps the latest ones in a ring buffer under increasing sequence numbers. A
+Subscription follows the broker from a cursor, "<broker id>:<sequence>", and
+keeps the events matching its filters:
+
+- "unassigned": tasks created without an executor, and claims, which take tasks
+  out of the unassigned list;
+- "executor": events of the tasks the subscriber executes;
+- "creator": events of the tasks the subscriber created.
+
+A subscription whose cursor comes from another broker (e.g. before a restart)
+or whose events already left the buffer is reset: the client downloads its
+lists again and follows the events from the new cursor.
+
+LocalBroker only sees the events of its own process, which is enough for one
+server process. Deployments with several processes plug in a broker shared by
+them with TASK_EVENTS['BROKER']; it needs the same id, publish(), read() and
+wait() as LocalBroker.
+"""
+
+import asyncio
+import itertools
+import secrets
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import router, transaction
+from django.utils.module_loading import import_string
+
+from .models import Task
+from .serializers import TaskValuesSerializer
+
+# Event types
+CREATED = 'created'
+CLAIMED = 'claimed'
+DONE = 'done'
+
+# Subscription filters
+UNASSIGNED = 'unassigned'
+EXECUTOR = 'executor'
+CREATOR = 'creator'
+
+
+class LocalBroker:
+    """
+    In-process broker keeping the last `size` events in a ring buffer.
+    Events are published from any thread and waited for from any event loop.
+    """
+
+    def __init__(self, size=10000):
+        # Cursors of an earlier process are told apart by the id
+        self.id = secrets.token_hex(4)
+        self._events = deque(maxlen=size)
+        self._last = 0
+        self._lock = threading.Lock()
+        self._waiters = set()
+
+    @property
+    def last(self):
+        return self._last
+
+    def publish(self, events):
+        with self._lock:
+            self._events.extend(events)
+            self._last += len(events)
+            waiters = list(self._waiters)
+        for loop, ready in waiters:
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                # The loop of an abandoned waiter was closed
+                pass
+
+    def read(self, after):
+        """
+        Return (events after sequence `after`, last sequence), or (None, last
+        sequence) when some of them already left the buffer.
+        """
+        with self._lock:
+            first = self._last - len(self._events) + 1
+            if not first - 1 <= after <= self._last:
+                return None, self._last
+            return list(itertools.islice(self._events, after - first + 1, None)), self._last
+
+    async def wait(self, after, timeout):
+        """
+        Wait up to `timeout` seconds for an event after sequence `after`.
+        Returns whether there is one.
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if self._last > after:
+                return True
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+def task_event(event_type, row):
+    return {'type': event_type, 'task': TaskValuesSerializer().to_representation(row)}
+
+
+def notify_tasks(event_type, rows, using=None):
+    """
+    Publish an `event_type` event for each task of `rows` (TaskValuesSerializer
+    rows, as stored after the change) when the current transaction commits.
+    """
+    events = [task_event(event_type, row) for row in rows]
+    if events:
+        transaction.on_commit(lambda: broker.publish(events), using=using or router.db_for_write(Task))
+
+
+class Subscription:
+    """
+    Events of `broker` after `cursor` (from now on when None) matching `filters`,
+    for the user `user_id`.
+    """
+
+    def __init__(self, broker, user_id, filters, cursor=None):
+        self.broker = broker
+        self.user_id = user_id
+        self.filters = set(filters)
+        self.reset = False
+        self.last = broker.last
+        if cursor is not None:
+            broker_id, _, last = cursor.partition(':')
+            if broker_id == broker.id and last.isdigit():
+                self.last = int(last)
+            else:
+                self.reset = True
+
+    @property
+    def cursor(self):
+        return f'{self.broker.id}:{self.last}'
+
+    def matches(self, event):
+        task = event['task']
+        return (
+            UNASSIGNED in self.filters and (event['type'] == CLAIMED or task['executor'] is None)
+            or EXECUTOR in self.filters and task['executor'] == self.user_id
+            or CREATOR in self.filters and task['creator'] == self.user_id
+        )
+
+    async def next(self, timeout):
+        """
+        Wait up to `timeout` seconds for matching events and return them, or
+        return [] right away when the subscription is reset (see `reset`).
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not self.reset:
+            events, self.last = self.broker.read(self.last)
+            if events is None:
+                self.reset = True
+                break
+            events = [event for event in events if self.matches(event)]
+            remaining = deadline - loop.time()
+            if events or remaining <= 0:
+                return events
+            await self.broker.wait(self.last, remaining)
+        return []
+
+
+broker = import_string(settings.TASK_EVENTS['BROKER'])(**settings.TASK_EVENTS['OPTIONS'])
@@ -0,0 +1,47 @@
+"""
+Password hashers whose cost parameters come from settings.PASSWORD_HASHER_PARAMS.
+
+They keep the algorithm names of Django's own hashers, so existing hashes stay
+valid, and Django rehashes a password on the next successful login whenever the
+preferred hasher or its parameters changed.
+"""
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+
+def hasher_param(algorithm, name, default):
+    return settings.PASSWORD_HASHER_PARAMS.get(algorithm, {}).get(name, default)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+
+    @property
+    def work_factor(self):
+        return hasher_param('scrypt', 'work_factor', ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return hasher_param('scrypt', 'block_size', ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return hasher_param('scrypt', 'parallelism', ScryptPasswordHasher.parallelism)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Requires the argon2-cffi package (pip install django[argon2]).
+    """
+
+    @property
+    def time_cost(self):
+        return hasher_param('argon2', 'time_cost', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return hasher_param('argon2', 'memory_cost', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return hasher_param('argon2', 'parallelism', Argon2PasswordHasher.parallelism)
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.changes import prune_changes
+
+
+class Command(BaseCommand):
+    help = 'Delete old changes from the task change feed. Clients that had not synced them download the lists again.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=float, default=settings.TASK_CHANGES['PRUNE_DAYS'],
+            help='Delete the changes older than this many days.'
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_changes(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} task changes'))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import UserTaskStats
+from api.stats import STAT_FIELDS, compute_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the UserTaskStats table from the tasks, or check it for drift with --check.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only compare the stored stats with the tasks and fail if they drifted.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            expected = compute_stats()
+
+            if options['check']:
+                self.check_drift(expected)
+                return
+
+            UserTaskStats.objects.all().delete()
+            UserTaskStats.objects.bulk_create(
+                [UserTaskStats(user_id=user_id, **values) for user_id, values in expected.items()],
+                batch_size=1000
+            )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt task stats for {len(expected)} users'))
+
+    def check_drift(self, expected):
+        zero = dict.fromkeys(STAT_FIELDS, 0)
+        stored = {row.pop('user_id'): row for row in UserTaskStats.objects.values('user_id', *STAT_FIELDS)}
+
+        drifted = []
+        for user_id in sorted(expected.keys() | stored.keys()):
+            want, have = expected.get(user_id, zero), stored.get(user_id, zero)
+            changed = [f'{field}: {have[field]} != {want[field]}' for field in STAT_FIELDS if have[field] != want[field]]
+            if changed:
+                drifted.append(user_id)
+                self.stdout.write(f'User {user_id}: ' + ', '.join(changed))
+
+        if drifted:
+            raise CommandError(f'Task stats drifted for {len(drifted)} users, run rebuild_task_stats to fix them')
+        self.stdout.write(self.style.SUCCESS(f'Task stats are up to date for {len(stored)} users'))
@@ -0,0 +1,91 @@
+import io
+import json
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api.models import Task
+from api.changes import record_reset
+from api.reset import reset_database
+from api.response_cache import response_cache
+
+
+def seed_tasks(tasks, users, password=None, batch_size=10000, seed=0, prefix='bench_user_'):
+    """
+    Create `users` users, each with an auth token, and `tasks` tasks with random
+    creators, executors, costs, statuses and deadlines. Returns the users.
+    """
+    rng = random.Random(seed)
+    # Hash the shared password once instead of once per user
+    hashed = make_password(password) if password else '!'
+
+    with transaction.atomic():
+        users = User.objects.bulk_create(
+            [User(username=f'{prefix}{i}', password=hashed) for i in range(users)],
+            batch_size=batch_size
+        )
+        Token.objects.bulk_create([Token(user=user, key=Token.generate_key()) for user in users], batch_size=batch_size)
+        today = timezone.localdate()
+
+        batch = []
+        for i in range(tasks):
+            creator = rng.choice(users)
+            executor = rng.choice(users) if rng.random() < 0.7 else None
+            if executor is creator:
+                executor = None
+            batch.append(Task(
+                creator=creator,
+                executor=executor,
+                name=f'Task {i}',
+                cost=Decimal(rng.randint(100, 1000000)) / 100,
+                is_done=rng.random() < 0.4,
+                deadline=today + timedelta(days=rng.randint(-90, 90)),
+            ))
+            if len(batch) == batch_size:
+                Task.objects.bulk_create(batch)
+                batch = []
+        Task.objects.bulk_create(batch)
+
+        # bulk_create skips the signals that maintain UserTaskStats, the response cache and
+        # the change feed: clients of the feed download the lists again
+        call_command('rebuild_task_stats', stdout=io.StringIO())
+        response_cache.clear()
+        record_reset()
+    return users
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with random users and tasks for benchmarks and load tests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--password', help='Password of every user, so they can log in (default: unusable).')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, the same seed gives the same data.')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--prefix', default='bench_user_', help='Prefix of the usernames.')
+        parser.add_argument('--clear', action='store_true', help='Delete all users and tasks first.')
+        parser.add_argument('--tokens', help='Write the id, username and token of every user to this JSON file.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            reset_database()
+
+        users = seed_tasks(
+            options['tasks'], options['users'], password=options['password'], batch_size=options['batch_size'],
+            seed=options['seed'], prefix=options['prefix'],
+        )
+
+        if options['tokens']:
+            tokens = dict(Token.objects.filter(user__in=users).values_list('user_id', 'key'))
+            with open(options['tokens'], 'w') as f:
+                json.dump([{'id': user.pk, 'username': user.username, 'token': tokens[user.pk]} for user in users], f)
+        self.stdout.write(self.style.SUCCESS(f'Created {len(users)} users and {options["tasks"]} tasks'))
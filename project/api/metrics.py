@@ -0,0 +1,140 @@
+"""
+In-process request metrics, recorded by api.middleware.MetricsMiddleware.
+
+Every request adds its wall time, database query count, database time and
+response size to histograms labelled with the view name and method. The
+histograms are rendered in the Prometheus text format by the metrics/ endpoint.
+Each process keeps its own metrics, like the token cache keeps its own stats.
+"""
+
+import bisect
+import threading
+import time
+
+from django.conf import settings
+
+
+class QueryTimer:
+    """
+    connection.execute_wrapper() callable that counts queries and adds up their time.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed bucket upper bounds, like a Prometheus histogram.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # The last one is +Inf
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def cumulative(self):
+        """
+        Yield (upper bound, observations <= upper bound) pairs, ending with +Inf.
+        """
+        running = 0
+        for bound, count in zip((*self.buckets, float('inf')), self.counts):
+            running += count
+            yield bound, running
+
+
+# Metric name (with its unit as suffix) -> help text of the exposition
+METRICS = {
+    'duration_seconds': 'Wall time of the requests',
+    'db_queries': 'Database queries run by the requests',
+    'db_duration_seconds': 'Time the requests spent in database queries',
+    'response_size_bytes': 'Size of the (non-streaming) responses',
+}
+
+
+class MetricsRegistry:
+    """
+    Histograms of METRICS per (view, method).
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view, method, **values):
+        with self._lock:
+            histograms = self._histograms.get((view, method))
+            if histograms is None:
+                histograms = self._histograms[(view, method)] = {
+                    name: Histogram(self.buckets[name]) for name in METRICS
+                }
+            for name, value in values.items():
+                if value is not None:
+                    histograms[name].observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self, prefix='api_request_'):
+        """
+        Return the histograms in the Prometheus text exposition format.
+        """
+        with self._lock:
+            items = sorted(self._histograms.items())
+            lines = []
+            for name, help_text in METRICS.items():
+                metric = prefix + name
+                lines.append(f'# HELP {metric} {help_text}.')
+                lines.append(f'# TYPE {metric} histogram')
+                for (view, method), histograms in items:
+                    histogram = histograms[name]
+                    labels = f'view="{escape_label(view)}",method="{escape_label(method)}"'
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{metric}_bucket{{{labels},le="{format_bound(bound)}"}} {count}')
+                    lines.append(f'{metric}_sum{{{labels}}} {histogram.total!r}')
+                    lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_bound(bound):
+    if bound == float('inf'):
+        return '+Inf'
+    return repr(float(bound))
+
+
+def render_counters(counters, prefix):
+    """
+    Render {name: (type, help, value)} as Prometheus gauges and counters.
+    """
+    lines = []
+    for name, (kind, help_text, value) in counters.items():
+        lines.append(f'# HELP {prefix}{name} {help_text}.')
+        lines.append(f'# TYPE {prefix}{name} {kind}')
+        lines.append(f'{prefix}{name} {value!r}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry(settings.REQUEST_METRICS['BUCKETS'])
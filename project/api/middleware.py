@@ -0,0 +1,129 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .db_routers import RoutingState, routing_state
+from .metrics import QueryTimer, registry
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Tracks the request for ReplicaRouter: enables replica reads for safe requests to
+    views with `replica_reads = True`, and pins users who wrote to the primary for
+    REPLICA_ROUTING['READ_YOUR_WRITES'] seconds.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(request)
+        token = routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing_state.reset(token)
+
+        if state.wrote:
+            state.pin()
+        return response
+
+    async def __acall__(self, request):
+        # The state set in this context is seen by the sync_to_async threads of the views
+        state = RoutingState(request)
+        token = routing_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routing_state.reset(token)
+
+        if state.wrote:
+            state.pin()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = routing_state.get()
+        view_class = getattr(view_func, 'view_class', None)
+        if state is not None and request.method in SAFE_METHODS:
+            state.replica_reads = getattr(view_class, 'replica_reads', False)
+
+
+class MetricsMiddleware:
+    """
+    Records the wall time, database queries, database time and response size of
+    every request in api.metrics.registry, and reports them to the client in a
+    Server-Timing header when REQUEST_METRICS['SERVER_TIMING'] is set.
+
+    Queries are counted on every database alias through connection.execute_wrapper(),
+    in the thread running the sync code of the request (the one sync_to_async() uses
+    for an async request): the rows a streaming response reads after the view
+    returned are not included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.REQUEST_METRICS['ENABLED']:
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with self.timed_queries(timer):
+            response = self.get_response(request)
+        return self.record(request, response, timer, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_METRICS['ENABLED']:
+            return await self.get_response(request)
+
+        timer = QueryTimer()
+        start = time.perf_counter()
+        # Connections are per thread: the wrappers go on the ones the views' ORM calls use
+        queries = await sync_to_async(self.timed_queries)(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(queries.close)()
+        return self.record(request, response, timer, time.perf_counter() - start)
+
+    def timed_queries(self, timer):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+        return stack
+
+    def record(self, request, response, timer, duration):
+        match = request.resolver_match
+        registry.observe(
+            match.view_name if match else '<unmatched>',
+            request.method,
+            duration_seconds=duration,
+            db_queries=timer.count,
+            db_duration_seconds=timer.duration,
+            response_size_bytes=None if response.streaming else len(response.content),
+        )
+        if settings.REQUEST_METRICS['SERVER_TIMING']:
+            response['Server-Timing'] = (
+                f'app;dur={duration * 1000:.2f}, db;dur={timer.duration * 1000:.2f};desc="queries={timer.count}"'
+            )
+        return response
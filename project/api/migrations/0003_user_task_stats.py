@@ -0,0 +1,52 @@
+# Generated by Django 5.0.6 on 2026-10-18 14:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_stats(apps, schema_editor):
+    Task = apps.get_model('api', 'Task')
+    UserTaskStats = apps.get_model('api', 'UserTaskStats')
+
+    stats = {}
+    for row in Task.objects.order_by().values('creator_id').annotate(
+        completed_tasks=Count('id', filter=Q(is_done=True)),
+        pending_tasks=Count('id', filter=Q(is_done=False)),
+        total_spent=Sum('cost'),
+    ):
+        stats.setdefault(row.pop('creator_id'), {}).update(row)
+    for row in Task.objects.filter(executor__isnull=False).order_by().values('executor_id').annotate(
+        assigned_tasks=Count('id'),
+        total_earned=Sum('cost', filter=Q(is_done=True), default=0),
+    ):
+        stats.setdefault(row.pop('executor_id'), {}).update(row)
+
+    UserTaskStats.objects.bulk_create(
+        [UserTaskStats(user_id=user_id, **values) for user_id, values in stats.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_task_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTaskStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('completed_tasks', models.IntegerField(default=0)),
+                ('pending_tasks', models.IntegerField(default=0)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('assigned_tasks', models.IntegerField(default=0)),
+                ('total_earned', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
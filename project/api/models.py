@@ -1,16 +1,64 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 # Task model stores info about the Task
 class Task(models.Model):
-    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tasks_created')
-    executor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tasks_assigned')
+    # The composite indexes in Meta start with these columns, so the default FK indexes are not needed
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tasks_created', db_index=False)
+    executor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tasks_assigned', db_index=False)
     name = models.CharField(max_length=255)
     cost = models.DecimalField(max_digits=8, decimal_places=2)
     is_done = models.BooleanField(default=False)
     deadline = models.DateField()
+    # Set on every save; queryset.update() callers set it themselves. Validates list responses (ETag)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Tasks created by a user, in id order (creator lists and their pages)
+            models.Index(fields=['creator', 'id'], name='task_creator_id_idx'),
+            # Completed/pending/overdue tasks of a creator
+            models.Index(fields=['creator', 'is_done', 'deadline'], name='task_creator_status_idx'),
+            # Tasks assigned to an executor, by status and deadline
+            models.Index(fields=['executor', 'is_done', 'deadline'], name='task_executor_status_idx'),
+            # Unassigned tasks ordered by cost
+            models.Index(fields=['cost'], condition=models.Q(executor__isnull=True), name='task_unassigned_cost_idx'),
+            # All tasks paged by deadline
+            models.Index(fields=['deadline', 'id'], name='task_deadline_id_idx'),
+            # Last change of all tasks, and of the tasks of a creator (list ETags)
+            models.Index(fields=['updated_at'], name='task_updated_at_idx'),
+            models.Index(fields=['creator', 'updated_at'], name='task_creator_updated_idx'),
+        ]
 
     def __str__(self):
         return f'{self.is_done} - {self.executor} - {self.deadline} - {self.name}'
 
 
+# UserTaskStats keeps the task statistics of a user up to date, see api/stats.py
+class UserTaskStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='task_stats')
+    # Tasks created by the user
+    completed_tasks = models.IntegerField(default=0)
+    pending_tasks = models.IntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Tasks assigned to the user
+    assigned_tasks = models.IntegerField(default=0)
+    total_earned = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f'{self.user} - {self.completed_tasks} done - {self.pending_tasks} pending - {self.assigned_tasks} assigned'
+
+
+# TaskChange is the change feed of the tasks, see api/changes.py. The id is the change
+# sequence; the feed is read by id ranges, so the foreign keys have neither indexes nor constraints
+class TaskChange(models.Model):
+    # The changed task, which may have been deleted since. Rows without a task are reset
+    # markers: clients with an older cursor have to download the task lists again
+    task = models.ForeignKey(Task, null=True, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+')
+    # The creator of a deleted task, whose row is gone
+    creator = models.ForeignKey(User, null=True, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.pk} - {self.task_id if self.task_id is not None else "reset"}'
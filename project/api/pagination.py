@@ -0,0 +1,128 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TaskKeysetPagination(BasePagination):
+    """
+    Opt-in keyset (cursor) pagination for task lists.
+
+    Pages are only produced when the client sends ``page_size`` or ``cursor``,
+    otherwise the view keeps returning the plain list. Every page is fetched
+    with a ``WHERE (deadline, id) > (...)`` filter instead of an OFFSET, so a
+    page costs the same no matter how deep the client has paged.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering_query_param = 'ordering'
+    page_size = 100
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    # Ordering name -> model fields. The last field must be unique.
+    orderings = {
+        'id': ('id',),
+        'deadline': ('deadline', 'id'),
+    }
+    default_ordering = 'id'
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def ordering_fields(self, request):
+        # The fields the pages are ordered by, which the rows must include
+        return self.orderings[self.decode_cursor(request)[0]]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering, position = self.decode_cursor(request)
+        fields = self.orderings[self.ordering]
+
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.keyset_filter(queryset.model, fields, position))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # Fetch one extra row to find out whether there is a next page
+        rows = list(queryset.order_by(*fields)[:self.page_size + 1])
+        page = rows[:self.page_size]
+        self.next_position = None
+        if len(rows) > self.page_size:
+            self.next_position = [self.get_value(page[-1], field) for field in fields]
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_value(self, obj, field):
+        value = obj[field] if isinstance(obj, dict) else getattr(obj, field)
+        # Dates and decimals are stored in the cursor as strings
+        return value if isinstance(value, int) else str(value)
+
+    def keyset_filter(self, model, fields, position):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        values = [model._meta.get_field(field).to_python(value) for field, value in zip(fields, position)]
+        condition = Q()
+        for i, field in enumerate(fields):
+            equal = {fields[j]: values[j] for j in range(i)}
+            condition |= Q(**equal, **{f'{field}__gt': values[i]})
+        # The redundant a >= x lets the database seek into the index instead of scanning it
+        return Q(**{f'{fields[0]}__gte': values[0]}) & condition
+
+    def encode_cursor(self, position):
+        payload = json.dumps({'o': self.ordering, 'p': position}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            ordering = request.query_params.get(self.ordering_query_param, self.default_ordering)
+            if ordering not in self.orderings:
+                ordering = self.default_ordering
+            return ordering, None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            ordering, position = payload['o'], payload['p']
+            if ordering not in self.orderings or not isinstance(position, list):
+                raise ValueError
+            # One string or number per ordering field, as encode_cursor writes them
+            if len(position) != len(self.orderings[ordering]) or not all(
+                isinstance(value, (str, int)) and not isinstance(value, bool) for value in position
+            ):
+                raise ValueError
+            return ordering, position
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
@@ -0,0 +1,112 @@
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson writes dates, datetimes, times and UUIDs natively in the same format as
+# DRF's encoder; whatever it can't encode (Decimal, lazy strings...) goes to DRF's default()
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+def orjson_dumps(data):
+    """
+    Encode data with orjson into the exact bytes of DRF's JSONRenderer with its
+    default settings. Raises TypeError for anything orjson can't encode.
+    """
+    ret = orjson.dumps(data, default=encoders.JSONEncoder().default, option=ORJSON_OPTIONS)
+    # Same escaping as JSONRenderer, to keep the output a strict javascript subset
+    if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return ret
+
+
+def dumps(data):
+    """
+    Encode data the same way DRF's JSONRenderer does with its default settings
+    (compact separators, unicode kept as-is, Decimal and date support).
+    """
+    if orjson is not None:
+        try:
+            return orjson_dumps(data).decode()
+        except TypeError:
+            pass
+    ret = json.dumps(data, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    return ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+
+
+def iter_json_array(items):
+    """
+    Yield a JSON array chunk by chunk, one element at a time.
+    """
+    yield '['
+    first = True
+    for item in items:
+        yield dumps(item) if first else ',' + dumps(item)
+        first = False
+    yield ']'
+
+
+def iter_ndjson(items):
+    """
+    Yield newline-delimited JSON, one line per item.
+    """
+    for item in items:
+        yield dumps(item) + '\n'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renderer for newline-delimited JSON (application/x-ndjson).
+
+    Views stream large lists with it directly; anything else that ends up here
+    (error responses for example) is rendered as a single line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return ''.join(iter_ndjson(items)).encode(self.charset)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    The output is the same as JSONRenderer's for compact, unicode JSON (DRF's
+    defaults), except that NaN and infinite floats are written as null instead of
+    raising. Indented output, other settings, or data orjson can't encode (integers
+    over 64 bits for example) go through JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return orjson_dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class PrometheusTextRenderer(BaseRenderer):
+    """
+    Renderer for metrics already formatted in the Prometheus text format.
+    Error responses are rendered as comment lines.
+    """
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = ''.join(f'# {key}: {value}\n' for key, value in data.items())
+        return data.encode(self.charset)
@@ -0,0 +1,156 @@
+"""
+Cache of rendered task list responses with invalidation by scope.
+
+Every list belongs to a scope: "all" for the lists every user sees the same
+(task/executor/, unassigned-tasks/), "creator:<id>" and "executor:<id>" for the
+lists of one user. A response is stored under the current version of its scope
+and of a global epoch, so a hit is a single cache read: no query, no
+serialization. Write paths call tasks_changed() with the creators and executors
+of the tasks they changed; once the transaction commits the versions of those
+scopes are replaced, and the old entries are never read again. clear() replaces
+the epoch, which orphans every entry at once.
+
+Versions are random tokens rather than counters: setting one needs no atomic
+increment, which the file-based backend does not have, and a version set after
+a commit can never be confused with one read before it. Responses read inside a
+transaction or from a read replica may not match the committed state of the
+primary, so they are not cached.
+"""
+
+import hashlib
+import secrets
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.http import HttpResponse
+
+from .models import Task
+
+GLOBAL = 'all'
+EPOCH = 'epoch'
+
+
+def request_variant(request):
+    """
+    Return what, besides the data, the response to `request` depends on: host (in
+    the absolute URLs of pagination links), path, media type and query parameters.
+    """
+    return '\n'.join([
+        request.get_host(), request.path, request.accepted_media_type,
+        *sorted(f'{name}={value}' for name, value in request.query_params.lists()),
+    ])
+
+
+def creator_scope(user_id):
+    return f'creator:{user_id}'
+
+
+def executor_scope(user_id):
+    return f'executor:{user_id}'
+
+
+class ResponseCache:
+    """
+    Rendered responses of the task lists, stored in the Django cache `cache_alias`.
+    """
+    key_prefix = 'task-list'
+    stored_headers = ('ETag', 'Last-Modified')
+
+    def __init__(self, cache_alias='default', timeout=300, enabled=True):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def version_key(self, scope):
+        return f'{self.key_prefix}:version:{scope}'
+
+    def versions(self, scope):
+        """
+        Return the current (epoch, scope version), starting new ones when missing.
+        """
+        keys = [self.version_key(EPOCH), self.version_key(scope)]
+        versions = self.cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                self.cache.add(key, secrets.token_hex(8), None)
+                versions[key] = self.cache.get(key)
+        return versions[keys[0]], versions[keys[1]]
+
+    def usable(self, using):
+        # Only committed data of the primary may be shared with other requests
+        return self.enabled and using == DEFAULT_DB_ALIAS and not connections[using].in_atomic_block
+
+    def response_key(self, request, view, scope):
+        """
+        Return the key of the response of `view` to `request`, or None when the
+        response must not be cached.
+        """
+        if request.method != 'GET' or request.accepted_renderer.format != 'json':
+            return None
+        epoch, version = self.versions(scope)
+        if epoch is None or version is None:
+            return None
+        digest = hashlib.md5(request_variant(request).encode(), usedforsecurity=False).hexdigest()
+        return f'{self.key_prefix}:{type(view).__name__}:{epoch}:{scope}:{version}:{digest}'
+
+    def get(self, key):
+        entry = self.cache.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        content, content_type, headers = entry
+        return HttpResponse(content, content_type=content_type, headers=headers)
+
+    def set(self, key, response):
+        response.render()
+        headers = {header: response[header] for header in self.stored_headers if header in response}
+        self.cache.set(key, (response.content, response['Content-Type'], headers), self.timeout)
+
+    def bump(self, scopes):
+        self.cache.set_many({self.version_key(scope): secrets.token_hex(8) for scope in scopes}, None)
+
+    def tasks_changed(self, creator_ids=(), executor_ids=(), using=None):
+        """
+        Invalidate the lists of all tasks and of the given creators and executors
+        when the current transaction commits (right away outside transactions).
+        The IDs are only read then, so they may be given as a lazy queryset.
+        """
+        def bump():
+            scopes = {GLOBAL}
+            scopes.update(creator_scope(user_id) for user_id in creator_ids)
+            scopes.update(executor_scope(user_id) for user_id in executor_ids if user_id is not None)
+            self.bump(scopes)
+        transaction.on_commit(bump, using=using or router.db_for_write(Task))
+
+    def clear(self, using=None):
+        """
+        Invalidate every cached response once the current transaction commits.
+        """
+        transaction.on_commit(lambda: self.bump([EPOCH]), using=using or router.db_for_write(Task))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache(
+    cache_alias=settings.RESPONSE_CACHE['CACHE_ALIAS'],
+    timeout=settings.RESPONSE_CACHE['TIMEOUT'],
+    enabled=settings.RESPONSE_CACHE['ENABLED'],
+)
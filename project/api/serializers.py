@@ -1,4 +1,9 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from .models import Task
 
 class TaskSerializer(serializers.ModelSerializer):
@@ -6,4 +11,173 @@ class TaskSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Task
-        fields = ['id', 'creator', 'executor', 'name', 'cost', 'deadline']
\ No newline at end of file
+        fields = ['id', 'creator', 'executor', 'name', 'cost', 'deadline', 'is_done']
+
+
+class TaskValuesSerializer:
+    """
+    Read-only fast path for task lists.
+
+    Rows are read with values_list() and turned into dicts directly instead of going
+    through the fields of TaskSerializer one by one. The output is the same as
+    TaskSerializer's, down to the rendered JSON.
+    """
+    fields = TaskSerializer.Meta.fields
+    # Field name -> column read with values_list()
+    columns = {
+        'id': 'id',
+        'creator': 'creator_id',
+        'executor': 'executor_id',
+        'name': 'name',
+        'cost': 'cost',
+        'deadline': 'deadline',
+        'is_done': 'is_done',
+    }
+    cost_places = Decimal('.1') ** Task._meta.get_field('cost').decimal_places
+    # Fields that ?expand= turns into {"id": ..., "username": ...}
+    expandable = ('creator', 'executor')
+
+    def __init__(self, undefined_executor=False, expand=(), fields=None, keys=()):
+        # Replace a missing executor with "undefined", as TaskWithExecutorAPIView does
+        self.undefined_executor = undefined_executor
+        self.cost_as_string = api_settings.COERCE_DECIMAL_TO_STRING
+        if fields is not None:
+            # Sparse fieldset: only these fields are read and sent, in the usual order
+            self.fields = [field for field in self.fields if field in fields]
+        self.expand = [field for field in self.expandable if field in expand and field in self.fields]
+        # Columns the view needs besides the fields, such as the paginator's ordering
+        selected = {self.columns[field] for field in self.fields}
+        self.keys = [key for key in keys if key not in selected]
+
+    def rows(self, queryset):
+        # Named rows, so paginators can read the ordering fields by name. The
+        # usernames of expanded users come from joins of the same query.
+        return queryset.values_list(
+            *[self.columns[field] for field in self.fields],
+            *[f'{field}__username' for field in self.expand],
+            *self.keys,
+            named=True,
+        )
+
+    def row(self, task):
+        # The row rows() would read for a Task instance, whose values may not be cleaned yet
+        return tuple(
+            Task._meta.get_field(field).to_python(getattr(task, self.columns[field])) for field in self.fields
+        )
+
+    def to_representation(self, row):
+        task = dict(zip(self.fields, row))
+        if 'cost' in task:
+            cost = task['cost'].quantize(self.cost_places)
+            # With two decimal places str() gives the same digits as DRF's '{:f}', faster
+            task['cost'] = str(cost) if self.cost_as_string else cost
+        if 'deadline' in task:
+            task['deadline'] = task['deadline'].isoformat()
+        for field, username in zip(self.expand, row[len(self.fields):]):
+            if task[field] is not None:
+                task[field] = {'id': task[field], 'username': username}
+        if self.undefined_executor and 'executor' in task and task['executor'] is None:
+            task['executor'] = "undefined"
+        return task
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+class BulkTaskListSerializer(serializers.ListSerializer):
+    """
+    Creates all validated tasks with bulk_create. Executors are resolved with one query
+    and, like in TaskCreateView, unknown executors are replaced with None.
+    """
+
+    def create(self, validated_data):
+        creator = self.context['request'].user
+        executor_ids = {item['executor_id'] for item in validated_data if item.get('executor_id')}
+        existing_ids = set(User.objects.filter(id__in=executor_ids).values_list('id', flat=True))
+
+        tasks = []
+        for item in validated_data:
+            executor_id = item.pop('executor_id', None)
+            tasks.append(Task(
+                creator=creator,
+                executor_id=executor_id if executor_id in existing_ids else None,
+                **item
+            ))
+        return Task.objects.bulk_create(tasks, batch_size=self.context.get('batch_size'))
+
+
+class BulkTaskSerializer(TaskSerializer):
+    creator = serializers.PrimaryKeyRelatedField(read_only=True)
+    # A plain id, checked in bulk by BulkTaskListSerializer instead of one query per task
+    executor = serializers.IntegerField(source='executor_id', required=False, allow_null=True)
+
+    class Meta(TaskSerializer.Meta):
+        list_serializer_class = BulkTaskListSerializer
+
+    def validate(self, attrs):
+        #creator is not the same as the executor
+        if attrs.get('executor_id') == self.context['request'].user.id:
+            raise serializers.ValidationError({'error': 'The creator of a task cannot be its executor'})
+        return attrs
+
+
+class TaskIdListSerializer(serializers.Serializer):
+    """
+    Body of the batch task endpoints: {"ids": [1, 2, ...]}.
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.TASK_BATCH_MAX_SIZE,
+    )
+
+
+class TaskChangesQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of the change feeds: ?since=<cursor>&page_size=<n>.
+    """
+    since = serializers.IntegerField(min_value=0, required=False)
+    page_size = serializers.IntegerField(min_value=1, max_value=settings.TASK_CHANGES['PAGE_SIZE'], required=False)
+
+
+class TaskListQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of the task lists: ?expand=creator,executor&fields=name,cost,...
+    """
+    expand = serializers.CharField(required=False)
+    fields = serializers.CharField(required=False)
+
+    def field_set(self, value, choices):
+        names = set(value.split(','))
+        unknown = names.difference(choices)
+        if unknown:
+            raise serializers.ValidationError(
+                f'Unknown fields: {", ".join(sorted(unknown))}. Expected some of {", ".join(choices)}.'
+            )
+        return names
+
+    def validate_expand(self, value):
+        return self.field_set(value, TaskValuesSerializer.expandable)
+
+    def validate_fields(self, value):
+        return self.field_set(value, TaskValuesSerializer.fields)
+
+
+class TaskEventsQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of the task event endpoints:
+    ?filter=unassigned,executor,creator&cursor=<cursor>&timeout=<seconds>.
+    """
+    filters = ('unassigned', 'executor', 'creator')  # see events.py
+    filter = serializers.CharField(default='unassigned')
+    cursor = serializers.CharField(required=False)
+    timeout = serializers.FloatField(min_value=0, max_value=settings.TASK_EVENTS['POLL_SECONDS'], required=False)
+
+    def validate_filter(self, value):
+        filters = set(value.split(','))
+        unknown = filters.difference(self.filters)
+        if unknown:
+            raise serializers.ValidationError(
+                f'Unknown filters: {", ".join(sorted(unknown))}. Expected some of {", ".join(self.filters)}.'
+            )
+        return filters
@@ -0,0 +1,123 @@
+"""
+Keep UserTaskStats, the cached task lists and the change feed in sync with tasks
+saved or deleted through the ORM, and with the tasks whose executor is deleted,
+publish their task events, and evict deleted tokens and deleted or changed users
+from the token authentication cache. Bulk write paths that
+bypass these signals do all of it themselves.
+"""
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .changes import record_changes, record_deletion
+from .events import CLAIMED, CREATED, DONE, notify_tasks
+from .models import Task
+from .response_cache import response_cache
+from .serializers import TaskValuesSerializer
+from .stats import add_task, apply_deltas, new_deltas, task_state
+
+
+@receiver(pre_save, sender=Task)
+def remember_task_state(sender, instance, raw=False, **kwargs):
+    # Load the stored state of an existing task so post_save can diff against it
+    instance._stats_old_state = None
+    if not raw and not instance._state.adding:
+        instance._stats_old_state = (
+            Task.objects.filter(pk=instance.pk)
+            .values_list('creator_id', 'executor_id', 'cost', 'is_done')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Task)
+def update_stats_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = new_deltas()
+    old_state = getattr(instance, '_stats_old_state', None)
+    if old_state is not None:
+        add_task(deltas, *old_state, sign=-1)
+    add_task(deltas, *task_state(instance))
+    apply_deltas(deltas)
+
+
+@receiver(post_delete, sender=Task)
+def update_stats_on_delete(sender, instance, **kwargs):
+    # The creator's row may be going away with the creator, so never create rows here
+    apply_deltas(add_task(new_deltas(), *task_state(instance), sign=-1), create=False)
+
+
+@receiver(post_save, sender=Task)
+def invalidate_lists_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old_state = getattr(instance, '_stats_old_state', None) or (instance.creator_id, None)
+    response_cache.tasks_changed(
+        creator_ids={old_state[0], instance.creator_id}, executor_ids={old_state[1], instance.executor_id},
+    )
+
+
+@receiver(post_delete, sender=Task)
+def invalidate_lists_on_delete(sender, instance, **kwargs):
+    response_cache.tasks_changed(creator_ids=[instance.creator_id], executor_ids=[instance.executor_id])
+
+
+@receiver(pre_delete, sender=User)
+def unassign_tasks_on_user_delete(sender, instance, **kwargs):
+    # The collector sets the executor of the user's tasks to NULL with a bulk UPDATE,
+    # which sends no Task signals. The tasks are read now, while they can be, to
+    # invalidate their lists, move the list validators (see conditional.py) and
+    # record their changes.
+    tasks = dict(Task.objects.filter(executor=instance).values_list('id', 'creator_id'))
+    if tasks:
+        Task.objects.filter(pk__in=tasks).update(updated_at=timezone.now())
+        record_changes(tasks)
+        response_cache.tasks_changed(creator_ids=set(tasks.values()), executor_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Task)
+def record_change_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_changes([instance.pk])
+
+
+@receiver(post_delete, sender=Task)
+def record_change_on_delete(sender, instance, **kwargs):
+    record_deletion(instance)
+
+
+@receiver(post_save, sender=Task)
+def notify_on_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    row = TaskValuesSerializer().row(instance)
+    old_state = getattr(instance, '_stats_old_state', None)
+    if created or old_state is None:
+        notify_tasks(CREATED, [row])
+        return
+    if old_state[1] is None and instance.executor_id is not None:
+        notify_tasks(CLAIMED, [row])
+    if not old_state[3] and instance.is_done:
+        notify_tasks(DONE, [row])
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+@receiver(post_delete, sender=User)
+def evict_deleted_user(sender, instance, **kwargs):
+    token_cache.delete_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def evict_saved_user(sender, instance, created=False, update_fields=None, **kwargs):
+    # The cached entries hold the user as it was, e.g. still active. Logins only
+    # update last_login, which authentication does not read.
+    if not created and set(update_fields or ()) != {'last_login'}:
+        token_cache.delete_user(instance.pk)
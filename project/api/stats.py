@@ -0,0 +1,102 @@
+"""
+Incremental maintenance of UserTaskStats.
+
+Every task contributes to the stats of its creator (completed or pending task,
+amount spent) and of its executor (assigned task, amount earned once done).
+Write paths compute the difference between the old and new contributions and
+apply it with F() expressions, so a stats read is a single primary-key lookup.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Task, UserTaskStats
+
+STAT_FIELDS = ('completed_tasks', 'pending_tasks', 'total_spent', 'assigned_tasks', 'total_earned')
+
+
+def new_deltas():
+    return defaultdict(lambda: dict.fromkeys(STAT_FIELDS, 0))
+
+
+def add_task(deltas, creator_id, executor_id, cost, is_done, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) the contribution of one task to `deltas`.
+    """
+    creator = deltas[creator_id]
+    creator['completed_tasks' if is_done else 'pending_tasks'] += sign
+    creator['total_spent'] += sign * Decimal(str(cost))
+    if executor_id is not None:
+        executor = deltas[executor_id]
+        executor['assigned_tasks'] += sign
+        if is_done:
+            executor['total_earned'] += sign * Decimal(str(cost))
+    return deltas
+
+
+def task_state(task):
+    return task.creator_id, task.executor_id, task.cost, task.is_done
+
+
+def apply_deltas(deltas, create=True):
+    """
+    Apply `deltas` ({user_id: {field: amount}}) to UserTaskStats in one transaction.
+    Missing rows are created when `create` is true.
+    """
+    with transaction.atomic():
+        for user_id, changes in deltas.items():
+            changes = {field: value for field, value in changes.items() if value}
+            if not changes:
+                continue
+            updated = UserTaskStats.objects.filter(user_id=user_id).update(
+                **{field: F(field) + value for field, value in changes.items()}
+            )
+            if updated or not create:
+                continue
+            try:
+                with transaction.atomic():
+                    UserTaskStats.objects.create(user_id=user_id, **changes)
+            except IntegrityError:
+                # Another request created the row in the meantime
+                UserTaskStats.objects.filter(user_id=user_id).update(
+                    **{field: F(field) + value for field, value in changes.items()}
+                )
+
+
+def record_created(tasks):
+    """
+    Apply the contribution of tasks inserted without signals (bulk_create).
+    """
+    deltas = new_deltas()
+    for task in tasks:
+        add_task(deltas, *task_state(task))
+    apply_deltas(deltas)
+
+
+def compute_stats():
+    """
+    Compute the stats of every user from scratch. Returns {user_id: {field: value}}.
+    """
+    stats = new_deltas()
+    created = (
+        Task.objects.order_by().values('creator_id').annotate(
+            completed_tasks=Count('id', filter=Q(is_done=True)),
+            pending_tasks=Count('id', filter=Q(is_done=False)),
+            total_spent=Sum('cost'),
+        )
+    )
+    for row in created:
+        stats[row.pop('creator_id')].update(row)
+
+    assigned = (
+        Task.objects.filter(executor__isnull=False).order_by().values('executor_id').annotate(
+            assigned_tasks=Count('id'),
+            total_earned=Sum('cost', filter=Q(is_done=True), default=0),
+        )
+    )
+    for row in assigned:
+        stats[row.pop('executor_id')].update(row)
+    return stats
@@ -0,0 +1,107 @@
+"""
+Task state changes shared by the single-task and batch views.
+
+Each action locks the requested tasks with one SELECT, decides an outcome per
+task, changes all the eligible ones with a single UPDATE ... WHERE id IN (...)
+and applies the stats difference. queryset.update() skips the signals that
+maintain UserTaskStats, the response cache and the change feed and publish the
+task events, so all of it is done here, and does not touch auto_now fields, so
+updated_at is set with the other columns.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import events
+from .changes import record_changes
+from .models import Task
+from .response_cache import response_cache
+from .serializers import TaskValuesSerializer
+from .stats import add_task, apply_deltas, new_deltas
+
+# Outcomes
+DONE = 'done'
+ASSIGNED = 'assigned'
+NOT_FOUND = 'not_found'
+NOT_AUTHORIZED = 'not_authorized'
+OWN_TASK = 'own_task'
+ALREADY_ASSIGNED = 'already_assigned'
+
+
+def lock_tasks(task_ids):
+    """
+    Return {task_id: row} of the existing tasks of `task_ids`, locked until the end
+    of the transaction (SQLite locks the whole database when the transaction starts).
+    """
+    rows = TaskValuesSerializer().rows(Task.objects.filter(pk__in=task_ids).select_for_update())
+    return {row.id: row for row in rows}
+
+
+def mark_tasks_done(task_ids, user):
+    """
+    Mark the tasks of `task_ids` executed by `user` as done.
+    Returns ({task_id: outcome}, {task_id: row as stored after the change}).
+    """
+    with transaction.atomic():
+        rows = lock_tasks(task_ids)
+        outcomes = {}
+        for task_id in task_ids:
+            row = rows.get(task_id)
+            if row is None:
+                outcomes[task_id] = NOT_FOUND
+            elif row.executor_id != user.pk:
+                outcomes[task_id] = NOT_AUTHORIZED
+            else:
+                outcomes[task_id] = DONE
+
+        # Tasks already done are reported as done without being updated again
+        pending = [rows[task_id] for task_id, outcome in outcomes.items() if outcome == DONE and not rows[task_id].is_done]
+        if pending:
+            Task.objects.filter(pk__in=[row.id for row in pending], executor=user, is_done=False).update(
+                is_done=True, updated_at=timezone.now(),
+            )
+            deltas = new_deltas()
+            for row in pending:
+                add_task(deltas, row.creator_id, row.executor_id, row.cost, False, sign=-1)
+                add_task(deltas, row.creator_id, row.executor_id, row.cost, True)
+                rows[row.id] = row._replace(is_done=True)
+            apply_deltas(deltas)
+            record_changes([row.id for row in pending])
+            response_cache.tasks_changed(creator_ids={row.creator_id for row in pending}, executor_ids=[user.pk])
+            events.notify_tasks(events.DONE, [rows[row.id] for row in pending])
+    return outcomes, rows
+
+
+def claim_tasks(task_ids, user):
+    """
+    Make `user` the executor of the unassigned tasks of `task_ids` they didn't create.
+    Returns {task_id: outcome}.
+    """
+    with transaction.atomic():
+        rows = lock_tasks(task_ids)
+        outcomes = {}
+        for task_id in task_ids:
+            row = rows.get(task_id)
+            if row is None:
+                outcomes[task_id] = NOT_FOUND
+            elif row.creator_id == user.pk:
+                outcomes[task_id] = OWN_TASK
+            elif row.executor_id is not None:
+                outcomes[task_id] = ALREADY_ASSIGNED
+            else:
+                outcomes[task_id] = ASSIGNED
+
+        claimed = [rows[task_id] for task_id, outcome in outcomes.items() if outcome == ASSIGNED]
+        if claimed:
+            Task.objects.filter(pk__in=[row.id for row in claimed], executor__isnull=True).update(
+                executor=user, updated_at=timezone.now(),
+            )
+            deltas = new_deltas()
+            for row in claimed:
+                add_task(deltas, row.creator_id, None, row.cost, row.is_done, sign=-1)
+                add_task(deltas, row.creator_id, user.pk, row.cost, row.is_done)
+            apply_deltas(deltas)
+            record_changes([row.id for row in claimed])
+            response_cache.tasks_changed(creator_ids={row.creator_id for row in claimed}, executor_ids=[user.pk])
+            events.notify_tasks(events.CLAIMED, [row._replace(executor_id=user.pk) for row in claimed])
+    return outcomes
@@ -1,3 +1,1305 @@
-from django.test import TestCase
+import io
+import json
+import re
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import uuid
+from pathlib import Path
+from time import monotonic
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from project.database import SQLITE_PRAGMAS, database_config
+
+from . import events
+from .authentication import TokenCache, token_cache
+from .db_routers import ReplicaRouter, check_pin_cache, routing_state
+from .events import LocalBroker
+from .metrics import Histogram, registry
+from .middleware import MetricsMiddleware, ReplicaRoutingMiddleware
+from .models import Task, TaskChange, UserTaskStats
+from .views import TaskCreateView, TasksCreatedByUser
+from .pagination import TaskKeysetPagination
+from .parsers import ORJSONParser
+from .renderers import ORJSONRenderer, dumps, orjson
+from .reset import reset_database, reset_models
+from .response_cache import response_cache
+from .serializers import TaskSerializer, TaskValuesSerializer
+from .stats import compute_stats
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Query plans are checked against SQLite')
+class TaskIndexTestCase(TestCase):
+    """
+    Every task read path must be served by an index, never by a full table scan.
+    """
+    full_scan = re.compile(r'\bSCAN api_task\b')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='test_user')
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        self.assertIn('USING', plan)
+        self.assertIsNone(self.full_scan.search(plan), plan)
+
+    def test_tasks_created_by_user(self):
+        self.assertUsesIndex(Task.objects.filter(creator=self.user).order_by('id'))
+
+    def test_tasks_of_executor(self):
+        self.assertUsesIndex(Task.objects.filter(executor=self.user))
+        self.assertUsesIndex(Task.objects.filter(executor=self.user, is_done=True))
+
+    def test_unassigned_tasks(self):
+        self.assertUsesIndex(Task.objects.filter(executor__isnull=True).order_by('cost'))
+
+    def test_overdue_tasks(self):
+        self.assertUsesIndex(Task.objects.filter(creator=self.user, is_done=False, deadline__lt=date.today()))
+
+    def test_keyset_pages(self):
+        paginator = TaskKeysetPagination()
+        for fields, position in ((('id',), [10]), (('deadline', 'id'), ['2024-06-01', 10])):
+            condition = paginator.keyset_filter(Task, fields, position)
+            self.assertUsesIndex(Task.objects.filter(condition).order_by(*fields)[:100])
+
+
+class UserTasksStatsQueryTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='test_user')
+        cls.other = User.objects.create(username='other_user')
+        Task.objects.create(creator=cls.user, executor=cls.other, name='Spent', cost=100, deadline=date(2000, 1, 1))
+        Task.objects.create(creator=cls.other, executor=cls.user, name='Earned', cost=50, is_done=True, deadline=date(2000, 1, 1))
+
+    def test_stats_in_one_query(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.assertNumQueries(1):
+            response = client.get('/api/user-tasks-stats/')
+        self.assertEqual(response.json(), {
+            'completed_tasks': 0,
+            'pending_tasks': 1,
+            'overdue_tasks': 1,
+            'assigned_tasks': 1,
+            'total_earned': 50.0,
+            'total_spent': 100.0,
+        })
+
+
+class UserTaskStatsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create(username='creator')
+        cls.executor = User.objects.create(username='executor')
+
+    def assertStats(self, user, **expected):
+        stats = UserTaskStats.objects.get(user=user)
+        for field, value in expected.items():
+            self.assertEqual(getattr(stats, field), value, field)
+
+    def test_stats_follow_task_life_cycle(self):
+        task = Task.objects.create(creator=self.creator, name='Task', cost=100, deadline=date(2024, 6, 1))
+        self.assertStats(self.creator, pending_tasks=1, completed_tasks=0, total_spent=100)
+
+        task.executor = self.executor
+        task.save()
+        self.assertStats(self.executor, assigned_tasks=1, total_earned=0)
+
+        task.is_done = True
+        task.save()
+        self.assertStats(self.creator, pending_tasks=0, completed_tasks=1, total_spent=100)
+        self.assertStats(self.executor, assigned_tasks=1, total_earned=100)
+
+        task.delete()
+        self.assertStats(self.creator, pending_tasks=0, completed_tasks=0, total_spent=0)
+        self.assertStats(self.executor, assigned_tasks=0, total_earned=0)
+        call_command('rebuild_task_stats', check=True, stdout=io.StringIO())
+
+    def test_rebuild_fixes_drift(self):
+        Task.objects.create(creator=self.creator, executor=self.executor, name='Task', cost=100, deadline=date(2024, 6, 1))
+        UserTaskStats.objects.filter(user=self.executor).update(assigned_tasks=5)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_task_stats', check=True, stdout=io.StringIO())
+        call_command('rebuild_task_stats', stdout=io.StringIO())
+        self.assertStats(self.executor, assigned_tasks=1)
+        self.assertEqual(compute_stats()[self.creator.pk]['pending_tasks'], 1)
+
+
+class TaskBulkCreateTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='test_user')
+        cls.executors = [User.objects.create(username=f'executor_{i}') for i in range(3)]
+
+    def bulk_create(self, count):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        tasks = [
+            {'name': f'Task {i}', 'cost': 10, 'deadline': '2024-06-01', 'executor': self.executors[i % 3].pk}
+            for i in range(count)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post('/api/task/bulk-create/', tasks, format='json')
+        self.assertEqual(response.status_code, 201)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        # The first call also creates the stats rows
+        self.bulk_create(3)
+        # Both fit in one INSERT, SQLite limits a statement to 999 parameters
+        self.assertEqual(self.bulk_create(5), self.bulk_create(140))
+        self.assertEqual(Task.objects.count(), 148)
+        call_command('rebuild_task_stats', check=True, stdout=io.StringIO())
+
+
+class BecomeExecutorTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create(username='creator')
+        cls.executor = User.objects.create(username='executor')
+
+    def become_executor(self, task_id, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.patch(f'/api/become-executor/{task_id}/')
+
+    def test_claim_queries(self):
+        done = Task.objects.create(creator=self.creator, name='Done', cost=40, is_done=True, deadline=date(2024, 6, 1))
+        task = Task.objects.create(creator=self.creator, name='Task', cost=100, deadline=date(2024, 6, 1))
+
+        # The first claim also creates the executor's stats row
+        self.assertEqual(self.become_executor(done.pk, self.executor).status_code, 200)
+
+        # Savepoint, conditional UPDATE of the task, SELECT of the claimed task for the stats,
+        # its event and the lists to invalidate, UPDATE of the stats in their own savepoint,
+        # INSERT of the change, release
+        with self.assertNumQueries(8):
+            response = self.become_executor(task.pk, self.executor)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Task.objects.get(pk=task.pk).executor, self.executor)
+        self.assertEqual(UserTaskStats.objects.get(user=self.executor).total_earned, 40)
+        call_command('rebuild_task_stats', check=True, stdout=io.StringIO())
+
+    def test_failed_claims(self):
+        task = Task.objects.create(creator=self.creator, executor=self.executor, name='Task', cost=100, deadline=date(2024, 6, 1))
+
+        # Savepoint, UPDATE matching no row, release, one SELECT to pick the error
+        with self.assertNumQueries(4):
+            response = self.become_executor(task.pk, self.creator)
+        self.assertEqual(response.json(), {'error': 'You cannot assign yourself as executor of your own task'})
+        self.assertEqual(self.become_executor(task.pk, User.objects.create(username='other')).status_code, 400)
+        self.assertEqual(self.become_executor(task.pk + 1, self.executor).status_code, 404)
+        call_command('rebuild_task_stats', check=True, stdout=io.StringIO())
+
+
+class TaskBatchTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create(username='creator')
+        cls.executor = User.objects.create(username='executor')
+
+    def create_tasks(self, count, **fields):
+        fields = {'creator': self.creator, 'cost': 10, 'deadline': date(2024, 6, 1), **fields}
+        return [Task.objects.create(name=f'Task {i}', **fields).pk for i in range(count)]
+
+    def patch(self, url, ids, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.patch(url, {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return {result['id']: result['outcome'] for result in response.json()['results']}, len(queries)
+
+    def test_mark_done(self):
+        mine = self.create_tasks(3, executor=self.executor)
+        done = self.create_tasks(1, executor=self.executor, is_done=True)
+        others = self.create_tasks(2)
+
+        outcomes, _ = self.patch('/api/task/bulk-mark-done/', mine + done + others + [999, mine[0]], self.executor)
+        self.assertEqual(outcomes, {
+            **dict.fromkeys(mine + done, 'done'), **dict.fromkeys(others, 'not_authorized'), 999: 'not_found'
+        })
+        self.assertEqual(Task.objects.filter(is_done=True).count(), 4)
+        self.assertEqual(UserTaskStats.objects.get(user=self.executor).total_earned, 40)
+        call_command('rebuild_task_stats', check=True, stdout=io.StringIO())
+
+    def test_claim(self):
+        free = self.create_tasks(3, is_done=True)
+        taken = self.create_tasks(1, executor=self.executor)
+        own = self.create_tasks(1, creator=self.executor)
+
+        outcomes, _ = self.patch('/api/task/bulk-become-executor/', free + taken + own + [999], self.executor)
+        self.assertEqual(outcomes, {
+            **dict.fromkeys(free, 'assigned'), **dict.fromkeys(taken, 'already_assigned'), own[0]: 'own_task', 999: 'not_found'
+        })
+        self.assertEqual(Task.objects.filter(executor=self.executor).count(), 4)
+        call_command('rebuild_task_stats', check=True, stdout=io.StringIO())
+
+    def test_query_count_does_not_grow_with_batch(self):
+        few, many = self.create_tasks(2), self.create_tasks(200)
+        # The first claim also creates the executor's stats row
+        self.patch('/api/task/bulk-become-executor/', self.create_tasks(1), self.executor)
+        self.assertEqual(
+            self.patch('/api/task/bulk-become-executor/', few, self.executor)[1],
+            self.patch('/api/task/bulk-become-executor/', many, self.executor)[1],
+        )
+        self.assertEqual(
+            self.patch('/api/task/bulk-mark-done/', few, self.executor)[1],
+            self.patch('/api/task/bulk-mark-done/', many, self.executor)[1],
+        )
+        call_command('rebuild_task_stats', check=True, stdout=io.StringIO())
+
+    def test_invalid_body(self):
+        client = APIClient()
+        client.force_authenticate(self.executor)
+        for body in ({}, {'ids': []}, {'ids': ['a']}, {'ids': list(range(1, settings.TASK_BATCH_MAX_SIZE + 2))}):
+            response = client.patch('/api/task/bulk-mark-done/', body, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('ids', response.json())
+
+
+class TokenCacheTestCase(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create(username='test_user')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_token_skips_lookup(self):
+        self.client.get('/api/tasks-created-by-user/')
+        # The ETag probe and the list, no token lookup
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/tasks-created-by-user/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_deleted_token_is_evicted(self):
+        self.assertEqual(self.client.get('/api/tasks-created-by-user/').status_code, 200)
+        self.token.delete()
+        self.assertEqual(self.client.get('/api/tasks-created-by-user/').status_code, 401)
+
+    def test_deleted_user_is_evicted(self):
+        self.assertEqual(self.client.get('/api/tasks-created-by-user/').status_code, 200)
+        self.user.delete()
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    def test_lru_and_ttl(self):
+        cache = TokenCache(max_size=2, ttl=60)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, self.user, key, cache.generation)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('c'), (self.user, 'c'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+        cache.ttl = 0
+        cache.set('d', self.user, 'd', cache.generation)
+        self.assertIsNone(cache.get('d'))
+
+    def test_deactivated_user_is_evicted(self):
+        self.assertEqual(self.client.get('/api/tasks-created-by-user/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/tasks-created-by-user/').status_code, 401)
+
+    def test_shared_cache(self):
+        # Two processes sharing the 'default' cache
+        caches['default'].clear()
+        cache, other = TokenCache(cache_alias='default'), TokenCache(cache_alias='default')
+        cache.set(self.token.key, self.user, self.token, cache.generation)
+        self.assertEqual(other.get(self.token.key), (self.user, self.token))
+
+        # Evictions reach the other process at once, without waiting for the TTL
+        other.delete_user(self.user.pk)
+        self.assertIsNone(cache.get(self.token.key))
+        cache.set(self.token.key, self.user, self.token, cache.generation)
+        other.delete(self.token.key)
+        self.assertIsNone(cache.get(self.token.key))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_racing_eviction_is_not_cached(self):
+        cache = TokenCache()
+        generation = cache.generation
+        cache.delete('a')
+        cache.set('a', self.user, 'a', generation)
+        self.assertIsNone(cache.get('a'))
+
+
+class LoginViewTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='test_user', password=make_password('test_password', hasher='pbkdf2_sha256'))
+
+    def test_password_rehashed_with_preferred_hasher(self):
+        response = APIClient().post('/api/login/', {'username': 'test_user', 'password': 'test_password'})
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$'))
+
+    def test_valid_token_short_circuits_login(self):
+        token = Token.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        response = client.post('/api/login/', {'username': 'test_user', 'check_token': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'token': token.key})
+
+        # The token must belong to the user logging in
+        response = client.post('/api/login/', {'username': 'other_user', 'check_token': 'true'})
+        self.assertEqual(response.status_code, 401)
+
+
+class TaskValuesSerializerTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        creator = User.objects.create(username='creator')
+        executor = User.objects.create(username='executor')
+        for name, cost, executor, is_done in (
+            ('Task', 100, executor, False),
+            ('Zero', 0, None, True),
+            ('Cents \u2028 \u00e9\u00e8 "quoted"', '0.05', executor, True),
+            ('Max', '999999.99', None, False),
+        ):
+            Task.objects.create(creator=creator, executor=executor, name=name, cost=cost, is_done=is_done, deadline=date(2024, 6, 1))
+
+    def test_same_json_as_model_serializer(self):
+        tasks = Task.objects.order_by('id')
+        expected = JSONRenderer().render(TaskSerializer(tasks, many=True).data)
+
+        serializer = TaskValuesSerializer()
+        self.assertEqual(JSONRenderer().render(serializer.serialize(serializer.rows(tasks))), expected)
+
+    def test_undefined_executor(self):
+        tasks = Task.objects.order_by('id')
+        expected = TaskSerializer(tasks, many=True).data
+        for task in expected:
+            if task['executor'] is None:
+                task['executor'] = "undefined"
+
+        serializer = TaskValuesSerializer(undefined_executor=True)
+        rendered = JSONRenderer().render(serializer.serialize(serializer.rows(tasks)))
+        self.assertEqual(rendered, JSONRenderer().render(expected))
+
+
+@unittest.skipIf(orjson is None, 'orjson is not installed')
+class ORJSONTestCase(TestCase):
+    data = {
+        'tasks': [
+            {'id': 1, 'cost': '10.50', 'deadline': date(2024, 6, 1), 'executor': None, 'is_done': False},
+            {'id': 2, 'cost': Decimal('0.05'), 'deadline': date(2024, 12, 31), 'executor': 'undefined', 'is_done': True},
+        ],
+        'datetimes': [
+            datetime(2024, 6, 1, 12, 30),
+            datetime(2024, 6, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+            datetime(2024, 6, 1, tzinfo=timezone(timedelta(hours=2))),
+            time(8, 15, 0, 500),
+        ],
+        'text': 'line \u2028 paragraph \u2029 \u00e9 "quoted" \\ \n',
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'duration': timedelta(minutes=90),
+        'numbers': [0, -1, 2 ** 63 - 1, 1.5],
+        'keys': {1: 'int', None: 'none', True: 'bool'},
+    }
+
+    def test_same_output_as_json_renderer(self):
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(ORJSONRenderer().render(self.data), expected)
+        self.assertEqual(dumps(self.data).encode(), expected)
+
+    def test_fallbacks(self):
+        # orjson can't encode integers over 64 bits, nor indent by 4
+        data = {'big': 2 ** 70, 'tasks': self.data['tasks']}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        media_type = 'application/json; indent=4'
+        self.assertEqual(ORJSONRenderer().render(data, media_type), JSONRenderer().render(data, media_type))
+
+    def test_parser(self):
+        body = '{"name": "T\u00e2che", "cost": 10.5, "deadline": "2024-06-01", "executor": null}'.encode()
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+
+        for invalid in (b'{"name": ', b'{"cost": NaN}'):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(invalid))
+
+    def test_views_use_orjson(self):
+        user = User.objects.create(username='creator')
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post('/api/task/create/', {'name': 'Task', 'cost': '12.30', 'deadline': '2024-06-01'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIsInstance(response.accepted_renderer, ORJSONRenderer)
+        self.assertEqual(response.json()['cost'], '12.30')
+
+
+class DatabaseConfigTestCase(TestCase):
+
+    def test_sqlite_pragmas(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite profile')
+        with connection.cursor() as cursor:
+            for name in ('synchronous', 'busy_timeout', 'cache_size'):
+                cursor.execute(f'PRAGMA {name}')
+                self.assertEqual(cursor.fetchone()[0], {'synchronous': 1}.get(name, SQLITE_PRAGMAS[name]))
+
+    def test_profiles(self):
+        config = database_config(Path('/srv'), {})
+        self.assertEqual(config['ENGINE'], 'project.backends.sqlite3')
+        self.assertEqual(config['NAME'], Path('/srv/db.sqlite3'))
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+        config = database_config(Path('/srv'), {
+            'DATABASE_ENGINE': 'postgresql', 'DATABASE_NAME': 'tasks', 'DATABASE_HOST': 'db', 'DATABASE_CONN_MAX_AGE': '60',
+        })
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((config['NAME'], config['HOST'], config['CONN_MAX_AGE']), ('tasks', 'db', 60))
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+
+        with self.assertRaises(ImproperlyConfigured):
+            database_config(Path('/srv'), {'DATABASE_ENGINE': 'oracle'})
+
+    def test_pool(self):
+        env = {'DATABASE_ENGINE': 'postgresql', 'DATABASE_POOL_MAX_SIZE': '8'}
+        with mock.patch('django.VERSION', (5, 0, 6, 'final', 0)), self.assertRaises(ImproperlyConfigured):
+            database_config(Path('/srv'), env)
+        with mock.patch('django.VERSION', (5, 1, 0, 'final', 0)):
+            config = database_config(Path('/srv'), env)
+        self.assertEqual(config['OPTIONS']['pool'], {'min_size': 2, 'max_size': 8, 'timeout': 10})
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+
+
+@override_settings(REPLICA_ROUTING={**settings.REPLICA_ROUTING, 'REPLICAS': ['replica1', 'replica2'], 'LAG_CHECK_INTERVAL': 0})
+@mock.patch('api.db_routers.replica_lag', return_value=0.0)
+class ReplicaRoutingTestCase(TransactionTestCase):
+    # Not TestCase: reads inside a transaction are never sent to a replica
+
+    def setUp(self):
+        self.user = User.objects.create(username='creator')
+        self.router = ReplicaRouter()
+        caches['default'].clear()
+
+    def route(self, method, view, user=None, action=None):
+        """
+        Send a request through ReplicaRoutingMiddleware and return the database a
+        Task and a Token read would use, right after `action` ran.
+        """
+        request = getattr(RequestFactory(), method)('/')
+        request.user = user or self.user
+        databases = []
+
+        def get_response(request):
+            middleware.process_view(request, view.as_view(), (), {})
+            if action is not None:
+                action()
+            databases.append((self.router.db_for_read(Task), self.router.db_for_read(Token)))
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        middleware(request)
+        return databases[0]
+
+    def test_round_robin(self, replica_lag):
+        self.assertEqual(self.route('get', TasksCreatedByUser), ('replica1', None))
+        self.assertEqual(self.route('get', TasksCreatedByUser), ('replica2', None))
+        self.assertEqual(self.route('get', TasksCreatedByUser), ('replica1', None))
+
+    def test_primary(self, replica_lag):
+        # Outside of a request, for writes and for views that don't opt in
+        self.assertIsNone(self.router.db_for_read(Task))
+        self.assertEqual(self.route('post', TasksCreatedByUser), (None, None))
+        self.assertEqual(self.route('get', TaskCreateView), (None, None))
+
+        # Reads in a transaction may be followed by writes that depend on them
+        with transaction.atomic():
+            self.assertEqual(self.route('get', TasksCreatedByUser), (None, None))
+
+        # Replicas too far behind are skipped
+        replica_lag.return_value = 60.0
+        self.assertEqual(self.route('get', TasksCreatedByUser), (None, None))
+
+    def test_least_lag(self, replica_lag):
+        replica_lag.side_effect = lambda alias: {'replica1': 3.0, 'replica2': 1.0}[alias]
+        with override_settings(REPLICA_ROUTING={**settings.REPLICA_ROUTING, 'SELECTION': 'least_lag'}):
+            self.assertEqual(self.route('get', TasksCreatedByUser), ('replica2', None))
+            self.assertEqual(self.route('get', TasksCreatedByUser), ('replica2', None))
+
+    def test_read_your_writes(self, replica_lag):
+        def write():
+            Task.objects.create(creator=self.user, name='Task', cost=1, deadline=date(2024, 6, 1))
+
+        # Reads after a write in the same request stay on the primary...
+        self.assertEqual(self.route('post', TaskCreateView, action=write), (None, None))
+        # ...and so do the next requests of the same user for READ_YOUR_WRITES seconds
+        self.assertEqual(self.route('get', TasksCreatedByUser), (None, None))
+        other = User.objects.create(username='other')
+        self.assertEqual(self.route('get', TasksCreatedByUser, user=other), ('replica1', None))
+
+        caches['default'].clear()
+        self.assertEqual(self.route('get', TasksCreatedByUser), ('replica2', None))
+
+    def test_state_is_reset(self, replica_lag):
+        self.route('get', TasksCreatedByUser)
+        self.assertIsNone(routing_state.get())
+
+    def test_pin_cache_must_be_shared(self, replica_lag):
+        # Pins in the memory of one process would not keep the user's next request
+        # on the primary when another process serves it
+        with self.assertRaises(ImproperlyConfigured):
+            check_pin_cache()
+        with tempfile.TemporaryDirectory() as location:
+            with override_settings(CACHES={**settings.CACHES, 'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+            }}):
+                check_pin_cache()
+
+    def test_async(self, replica_lag):
+        request = RequestFactory().get('/')
+        request.user = self.user
+
+        async def get_response(request):
+            middleware.process_view(request, TasksCreatedByUser.as_view(), (), {})
+            # Sync views run in a thread, which sees the state of the request
+            return await sync_to_async(self.router.db_for_read)(Task)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertEqual(async_to_sync(middleware)(request), 'replica1')
+        self.assertIsNone(routing_state.get())
+
+
+class MetricsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', is_staff=True)
+        for i in range(3):
+            Task.objects.create(creator=cls.admin, name=f'Task {i}', cost=10, deadline=date(2024, 6, 1))
+
+    def setUp(self):
+        registry.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_histogram(self):
+        histogram = Histogram((1, 5))
+        for value in (0, 1, 2, 5, 6):
+            histogram.observe(value)
+        self.assertEqual(list(histogram.cumulative()), [(1, 2), (5, 4), (float('inf'), 5)])
+        self.assertEqual((histogram.count, histogram.total), (5, 14))
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tasks-created-by-user/')
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="queries=(\d+)"$')
+        self.assertEqual(re.search(r'queries=(\d+)', response['Server-Timing'])[1], str(len(queries)))
+
+    def test_async(self):
+        async def get_response(request):
+            await sync_to_async(lambda: list(Task.objects.all()))()
+            return HttpResponse(b'{}')
+
+        middleware = MetricsMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().get('/')
+        request.resolver_match = None
+        response = async_to_sync(middleware)(request)
+        self.assertRegex(response['Server-Timing'], r'desc="queries=1"$')
+        self.assertIn(('<unmatched>', 'GET'), registry._histograms)
+
+    def test_prometheus_endpoint(self):
+        for _ in range(2):
+            self.client.get('/api/tasks-created-by-user/')
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+        text = response.content.decode()
+        self.assertIn('# TYPE api_request_duration_seconds histogram', text)
+        self.assertIn('api_request_duration_seconds_count{view="user_tasks",method="GET"} 2', text)
+        self.assertIn('api_request_db_queries_bucket{view="user_tasks",method="GET",le="+Inf"} 2', text)
+        self.assertIn('api_request_response_size_bytes_count{view="user_tasks",method="GET"} 2', text)
+        self.assertIn('# TYPE api_token_cache_misses_total counter', text)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='user'))
+        self.assertEqual(client.get('/api/metrics/').status_code, 403)
+
+
+class SeedTasksTestCase(TestCase):
+
+    def test_seed_tasks(self):
+        with tempfile.NamedTemporaryFile(suffix='.json') as tokens:
+            call_command('seed_tasks', tasks=50, users=5, password='secret', tokens=tokens.name, stdout=io.StringIO())
+            users = json.load(tokens)
+
+        self.assertEqual(Task.objects.count(), 50)
+        self.assertEqual(len(users), 5)
+        self.assertEqual(Token.objects.get(key=users[0]['token']).user.username, users[0]['username'])
+        self.assertTrue(User.objects.get(pk=users[0]['id']).check_password('secret'))
+        call_command('rebuild_task_stats', check=True, stdout=io.StringIO())
+
+        # The same seed gives the same data
+        first = list(Task.objects.order_by('id').values_list('cost', 'is_done', 'deadline'))
+        call_command('seed_tasks', tasks=50, users=5, clear=True, stdout=io.StringIO())
+        self.assertEqual(list(Task.objects.order_by('id').values_list('cost', 'is_done', 'deadline')), first)
+
+
+class ResetDatabaseTestCase(TestCase):
+    def setUp(self):
+        call_command('seed_tasks', tasks=100, users=10, stdout=io.StringIO())
+        self.user = User.objects.first()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.get(user=self.user).key}')
+
+    def test_reset_models(self):
+        self.assertEqual(
+            [model._meta.label for model in reset_models((Task, User))],
+            ['api.Task', 'auth.User_groups', 'auth.User_user_permissions', 'admin.LogEntry',
+             'api.UserTaskStats', 'authtoken.Token', 'auth.User'],
+        )
+
+    def test_clear_db(self):
+        self.assertEqual(self.client.get('/api/tasks-created-by-user/').status_code, 200)
+        with mock.patch('django.db.models.signals.post_delete.send') as post_delete, self.assertNumQueries(13):
+            response = APIClient().get('/api/clear_db/')
+        self.assertEqual(response.status_code, 200)
+        post_delete.assert_not_called()
+
+        for model in (Task, UserTaskStats, Token, User):
+            self.assertFalse(model.objects.exists())
+        # Without the signals the token cache is cleared as a whole
+        self.assertEqual(self.client.get('/api/tasks-created-by-user/').status_code, 401)
+
+
+class ResponseCacheTestCase(TransactionTestCase):
+    # Not TestCase: responses read inside a transaction are never cached
+
+    LISTS = ('/api/task/executor/', '/api/unassigned-tasks/', '/api/tasks-created-by-user/', '/api/user-tasks/')
+
+    def setUp(self):
+        # Off by default on the in-memory backend, which is right for a single process like this one
+        patcher = mock.patch.object(response_cache, 'enabled', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        token_cache.clear()
+        caches['responses'].clear()
+        self.creator = User.objects.create(username='creator')
+        self.executor = User.objects.create(username='executor')
+        self.task = Task.objects.create(creator=self.creator, name='Task', cost=10, deadline=date(2024, 6, 1))
+        self.clients = {}
+        for user in (self.creator, self.executor):
+            self.clients[user] = APIClient()
+            self.clients[user].credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+
+    def get(self, url, user):
+        response = self.clients[user].get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def assertFresh(self):
+        # Every list, as each user sees it, is the same with and without the cache
+        for user in (self.creator, self.executor):
+            for url in self.LISTS:
+                cached = self.get(url, user)
+                with mock.patch.object(response_cache, 'enabled', False):
+                    self.assertEqual(cached, self.get(url, user), url)
+
+    def test_executor_deletion_invalidates(self):
+        self.task.executor = self.executor
+        self.task.save()
+        other = User.objects.create(username='other')
+        self.clients[other] = APIClient()
+        self.clients[other].credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+        for url in self.LISTS:
+            self.get(url, self.creator)
+            self.get(url, other)
+        # The collector nulls the executor with one UPDATE, without Task signals
+        self.executor.delete()
+        for user in (self.creator, other):
+            for url in self.LISTS:
+                cached = self.get(url, user)
+                with mock.patch.object(response_cache, 'enabled', False):
+                    self.assertEqual(cached, self.get(url, user), url)
+        self.assertEqual(json.loads(self.get('/api/task/executor/', other))[0]['executor'], 'undefined')
+
+    def test_expanded_lists_are_not_cached(self):
+        # Renaming a user changes no task, so neither the cache nor an ETag may hold usernames
+        self.task.executor = self.executor
+        self.task.save()
+        Task.objects.create(creator=self.creator, name='Unassigned', cost=10, deadline=date(2024, 6, 1))
+        # Each list as a user who has tasks in it
+        lists = list(zip(self.LISTS, (self.creator, self.creator, self.creator, self.executor)))
+        for url, user in lists:
+            response = self.clients[user].get(url, {'expand': 'creator,executor'})
+            self.assertNotIn('ETag', response)
+        User.objects.filter(pk=self.creator.pk).update(username='renamed')
+        for url, user in lists:
+            response = self.clients[user].get(url, {'expand': 'creator,executor'})
+            self.assertEqual(response.json()[0]['creator']['username'], 'renamed', url)
+
+    def test_hit_skips_database(self):
+        for url in (*self.LISTS, '/api/task/executor/?page_size=1'):
+            first = self.get(url, self.creator)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.get(url, self.creator), first)
+
+    def test_writes_invalidate(self):
+        self.assertFresh()
+        self.clients[self.creator].post('/api/task/create/', {'name': 'New', 'cost': 5, 'deadline': '2024-06-02'})
+        self.assertFresh()
+        self.clients[self.creator].post('/api/task/bulk-create/', [{'name': 'Bulk', 'cost': 5, 'deadline': '2024-06-02'}], format='json')
+        self.assertFresh()
+        self.clients[self.executor].patch(f'/api/become-executor/{self.task.pk}/')
+        self.assertFresh()
+        self.clients[self.executor].patch(f'/api/mark-task-done/{self.task.pk}/')
+        self.assertFresh()
+        ids = list(Task.objects.filter(executor__isnull=True).values_list('id', flat=True))
+        self.clients[self.executor].patch('/api/task/bulk-become-executor/', {'ids': ids}, format='json')
+        self.assertFresh()
+        self.clients[self.executor].patch('/api/task/bulk-mark-done/', {'ids': ids}, format='json')
+        self.assertFresh()
+        Task.objects.filter(pk=self.task.pk).delete()
+        self.assertFresh()
+
+        self.get('/api/task/executor/', self.creator)
+        reset_database()
+        self.creator = User.objects.create(username='creator')
+        client = self.clients[self.creator] = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.creator).key}')
+        self.assertEqual(client.get('/api/task/executor/').json(), [])
+
+    def test_other_scopes_stay_cached(self):
+        other = User.objects.create(username='other')
+        Task.objects.create(creator=other, name='Other task', cost=10, deadline=date(2024, 6, 1))
+        self.get('/api/tasks-created-by-user/', self.creator)
+        with self.assertNumQueries(0):
+            self.get('/api/tasks-created-by-user/', self.creator)
+
+        # A task of another creator changes the global lists only
+        self.get('/api/task/executor/', self.creator)
+        Task.objects.create(creator=other, name='Other task', cost=10, deadline=date(2024, 6, 1))
+        with self.assertNumQueries(0):
+            self.get('/api/tasks-created-by-user/', self.creator)
+        with self.assertNumQueries(2):
+            self.get('/api/task/executor/', self.creator)
+
+    def test_cached_not_modified(self):
+        etag = self.clients[self.creator].get('/api/task/executor/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.clients[self.creator].get('/api/task/executor/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_not_cached_in_transaction(self):
+        with transaction.atomic():
+            self.get('/api/task/executor/', self.creator)
+            with self.assertNumQueries(2):
+                self.get('/api/task/executor/', self.creator)
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={
+            **settings.CACHES,
+            'responses': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory},
+        }):
+            self.test_hit_skips_database()
+            Task.objects.create(creator=self.creator, name='New', cost=5, deadline=date(2024, 6, 2))
+            self.assertFresh()
+
+
+class ConditionalGetTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create(username='creator')
+        cls.executor = User.objects.create(username='executor')
+        cls.task = Task.objects.create(creator=cls.creator, name='Task', cost=10, deadline=date(2024, 6, 1))
+
+    def get(self, url, user=None, etag=None):
+        client = APIClient()
+        client.force_authenticate(user or self.creator)
+        return client.get(url, **({'HTTP_IF_NONE_MATCH': etag} if etag else {}))
+
+    def test_not_modified(self):
+        for url in ('/api/tasks-created-by-user/', '/api/task/executor/', '/api/task/executor/?page_size=1'):
+            response = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('Last-Modified', response)
+            # Only the validators are read
+            with self.assertNumQueries(1):
+                response = self.get(url, etag=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+
+    def test_representations_have_their_own_etag(self):
+        etags = {self.get(url)['ETag'] for url in (
+            '/api/task/executor/', '/api/task/executor/?page_size=1', '/api/task/executor/?format=json',
+            '/api/tasks-created-by-user/',
+        )}
+        self.assertEqual(len(etags), 4)
+
+    def test_executor_deletion_moves_the_etag(self):
+        Task.objects.filter(pk=self.task.pk).update(executor=self.executor)
+        etags = {url: self.get(url)['ETag'] for url in ('/api/task/executor/', '/api/tasks-created-by-user/')}
+        self.executor.delete()
+        for url, etag in etags.items():
+            response = self.get(url, etag=etag)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response.json()[0]['executor'], 'undefined' if url == '/api/task/executor/' else None)
+
+    def test_changes_move_the_etag(self):
+        other = Task.objects.create(creator=self.creator, name='Other', cost=10, deadline=date(2024, 6, 1))
+
+        def changed(url, change, user=None):
+            etag = self.get(url, user)['ETag']
+            change()
+            response = self.get(url, user, etag=etag)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotEqual(response['ETag'], etag)
+
+        def call(method, url, user, **kwargs):
+            client = APIClient()
+            client.force_authenticate(user)
+            self.assertEqual(getattr(client, method)(url, **kwargs).status_code, 200)
+
+        changed('/api/task/executor/', lambda: call('patch', f'/api/become-executor/{self.task.pk}/', self.executor))
+        changed('/api/user-tasks/', lambda: call('patch', f'/api/mark-task-done/{self.task.pk}/', self.executor), self.executor)
+        changed('/api/tasks-created-by-user/', lambda: call(
+            'patch', '/api/task/bulk-become-executor/', self.executor, data={'ids': [other.pk]}, format='json',
+        ))
+        changed('/api/tasks-created-by-user/', lambda: call(
+            'patch', '/api/task/bulk-mark-done/', self.executor, data={'ids': [other.pk]}, format='json',
+        ))
+        changed('/api/tasks-created-by-user/', lambda: Task.objects.filter(pk=other.pk).delete())
+
+
+@override_settings(TASK_CHANGES={**settings.TASK_CHANGES, 'SETTLE_SECONDS': 0})
+class TaskChangesTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create(username='creator')
+        cls.executor = User.objects.create(username='executor')
+
+    def changes(self, url='/api/task/executor/changes/', user=None, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def call(self, url, user, **kwargs):
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assertEqual(client.patch(url, **kwargs).status_code, 200)
+
+    def test_new_client_resets(self):
+        Task.objects.create(creator=self.creator, name='Task', cost=10, deadline=date(2024, 6, 1))
+        page = self.changes()
+        self.assertEqual(page['reset'], True)
+        self.assertEqual(page['changes'], [])
+        self.assertEqual(self.changes(since=page['cursor']), {
+            'reset': False, 'cursor': page['cursor'], 'changes': [], 'more': False,
+        })
+
+    def test_task_life_cycle(self):
+        cursor = self.changes()['cursor']
+        task = Task.objects.create(creator=self.creator, name='Task', cost=10, deadline=date(2024, 6, 1))
+        other = Task.objects.create(creator=self.creator, name='Other', cost=20, deadline=date(2024, 6, 1))
+        self.call(f'/api/become-executor/{task.pk}/', self.executor)
+        self.call(f'/api/mark-task-done/{task.pk}/', self.executor)
+        self.call('/api/task/bulk-become-executor/', self.executor, data={'ids': [other.pk]}, format='json')
+        other_id = other.pk
+        other.delete()
+
+        page = self.changes(since=cursor)
+        self.assertFalse(page['reset'])
+        # Each task once, in its current state, ordered by its last change
+        self.assertEqual(page['changes'], [
+            TaskValuesSerializer(undefined_executor=True).to_representation(
+                TaskValuesSerializer().rows(Task.objects.filter(pk=task.pk))[0]
+            ),
+            {'id': other_id, 'deleted': True},
+        ])
+        self.assertEqual(page['changes'][0]['executor'], self.executor.pk)
+        self.assertTrue(page['changes'][0]['is_done'])
+        self.assertEqual(self.changes(since=page['cursor'])['changes'], [])
+
+    def test_creator_scope(self):
+        other_creator = User.objects.create(username='other')
+        cursor = self.changes()['cursor']
+        mine = Task.objects.create(creator=self.creator, name='Mine', cost=10, deadline=date(2024, 6, 1))
+        deleted = Task.objects.create(creator=self.creator, name='Deleted', cost=10, deadline=date(2024, 6, 1))
+        Task.objects.create(creator=other_creator, name='Theirs', cost=10, deadline=date(2024, 6, 1))
+        Task.objects.create(creator=other_creator, name='Gone', cost=10, deadline=date(2024, 6, 1)).delete()
+        deleted_id = deleted.pk
+        deleted.delete()
+
+        page = self.changes('/api/tasks-created-by-user/changes/', self.creator, since=cursor)
+        self.assertEqual([change['id'] for change in page['changes']], [mine.pk, deleted_id])
+        self.assertEqual(page['changes'][1], {'id': deleted_id, 'deleted': True})
+
+        response = APIClient().get('/api/tasks-created-by-user/changes/', {'since': cursor})
+        self.assertEqual(response.status_code, 401)
+
+    def test_executor_deletion(self):
+        task = Task.objects.create(
+            creator=self.creator, executor=self.executor, name='Task', cost=10, deadline=date(2024, 6, 1),
+        )
+        cursor = self.changes()['cursor']
+        self.executor.delete()
+        page = self.changes(since=cursor)
+        self.assertEqual([(change['id'], change['executor']) for change in page['changes']], [(task.pk, 'undefined')])
+
+    def test_pages(self):
+        cursor = self.changes()['cursor']
+        ids = [Task.objects.create(creator=self.creator, name=f'Task {n}', cost=n, deadline=date(2024, 6, 1)).pk
+               for n in range(5)]
+        seen = []
+        while True:
+            page = self.changes(since=cursor, page_size=2)
+            seen += [change['id'] for change in page['changes']]
+            cursor = page['cursor']
+            if not page['more']:
+                break
+        self.assertEqual(seen, ids)
+
+    def test_unsettled_changes_hold_the_cursor(self):
+        cursor = self.changes()['cursor']
+        task = Task.objects.create(creator=self.creator, name='Task', cost=10, deadline=date(2024, 6, 1))
+        with override_settings(TASK_CHANGES={**settings.TASK_CHANGES, 'SETTLE_SECONDS': 60}):
+            page = self.changes(since=cursor)
+        # The change is sent, but the cursor stays before it so it is sent again
+        self.assertEqual([change['id'] for change in page['changes']], [task.pk])
+        self.assertEqual(page['cursor'], cursor)
+        self.assertEqual([change['id'] for change in self.changes(since=cursor)['changes']], [task.pk])
+
+    def test_reset_markers(self):
+        cursor = self.changes()['cursor']
+        Task.objects.create(creator=self.creator, name='Task', cost=10, deadline=date(2024, 6, 1))
+        TaskChange.objects.update(created_at=datetime(2024, 1, 1, tzinfo=timezone.utc))
+        out = io.StringIO()
+        call_command('prune_task_changes', days=1, stdout=out)
+        self.assertIn('Deleted', out.getvalue())
+
+        page = self.changes(since=cursor)
+        self.assertTrue(page['reset'])
+        self.assertFalse(self.changes(since=page['cursor'])['reset'])
+
+        reset_database()
+        self.assertTrue(self.changes(since=page['cursor'])['reset'])
+
+    def test_cursor_past_the_log(self):
+        # E.g. a cursor from before a database restore: waiting for it would never end
+        Task.objects.create(creator=self.creator, name='Task', cost=10, deadline=date(2024, 6, 1))
+        cursor = self.changes()['cursor']
+        self.assertEqual(self.changes(since=cursor + 100), {'reset': True, 'cursor': cursor, 'changes': [], 'more': False})
+        TaskChange.objects.all().delete()
+        self.assertEqual(self.changes(since=cursor + 1), {'reset': True, 'cursor': 0, 'changes': [], 'more': False})
+
+    def test_invalid_query(self):
+        response = APIClient().get('/api/task/executor/changes/', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('since', response.json())
+
+
+class TaskEventsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create(username='creator')
+        cls.executor = User.objects.create(username='executor')
+        cls.other = User.objects.create(username='other')
+        cls.tokens = {user.pk: Token.objects.create(user=user).key for user in (cls.creator, cls.executor, cls.other)}
+
+    def setUp(self):
+        self.broker = LocalBroker(size=100)
+        for target in ('api.events.broker', 'api.async_views.broker'):
+            patcher = mock.patch(target, self.broker)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def headers(self, user):
+        return {'HTTP_AUTHORIZATION': f'Token {self.tokens[user.pk]}'}
+
+    def poll(self, user, **params):
+        response = self.client.get('/api/task/events/poll/', {'timeout': 0, **params}, **self.headers(user))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def events(self, user, cursor, filter='unassigned'):
+        return [(event['type'], event['task']['id']) for event in self.poll(user, cursor=cursor, filter=filter)['events']]
+
+    def call(self, method, url, user, **kwargs):
+        client = APIClient()
+        client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(client, method)(url, format='json', **kwargs)
+        self.assertIn(response.status_code, (200, 201))
+        return response.json()
+
+    def test_write_paths_notify(self):
+        cursor = self.poll(self.executor)['cursor']
+        task = self.call('post', '/api/task/create/', self.creator, data={'name': 'Task', 'cost': 10, 'deadline': '2024-06-01'})
+        assigned = self.call('post', '/api/task/create/', self.creator, data={
+            'name': 'Assigned', 'cost': 10, 'deadline': '2024-06-01', 'executor': self.executor.pk,
+        })
+        bulk = self.call('post', '/api/task/bulk-create/', self.creator, data=[
+            {'name': 'Bulk', 'cost': 20, 'deadline': '2024-06-01'},
+            {'name': 'Other bulk', 'cost': 30, 'deadline': '2024-06-01'},
+        ])['created']
+        self.call('patch', f'/api/become-executor/{task["id"]}/', self.executor)
+        self.call('patch', '/api/task/bulk-become-executor/', self.other, data={'ids': [bulk[0]['id']]})
+        self.call('patch', f'/api/mark-task-done/{task["id"]}/', self.executor)
+        self.call('patch', '/api/task/bulk-mark-done/', self.other, data={'ids': [bulk[0]['id']]})
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(pk=bulk[1]['id']).get().delete()
+
+        self.assertEqual(self.events(self.executor, cursor), [
+            ('created', task['id']), ('created', bulk[0]['id']), ('created', bulk[1]['id']),
+            ('claimed', task['id']), ('claimed', bulk[0]['id']),
+        ])
+        self.assertEqual(self.events(self.executor, cursor, 'executor'), [
+            ('created', assigned['id']), ('claimed', task['id']), ('done', task['id']),
+        ])
+        self.assertEqual(self.events(self.other, cursor, 'executor,unassigned'), [
+            ('created', task['id']), ('created', bulk[0]['id']), ('created', bulk[1]['id']),
+            ('claimed', task['id']), ('claimed', bulk[0]['id']), ('done', bulk[0]['id']),
+        ])
+        self.assertEqual(len(self.events(self.creator, cursor, 'creator')), 8)
+
+        # The events carry the task as stored after the change
+        event = self.poll(self.executor, cursor=cursor, filter='executor')['events'][-1]
+        self.assertEqual(event['task'], {**task, 'executor': self.executor.pk, 'is_done': True})
+
+    def test_orm_saves_notify(self):
+        cursor = self.poll(self.executor)['cursor']
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(creator=self.creator, name='Task', cost=10, deadline='2024-06-01')
+            task.executor = self.executor
+            task.is_done = True
+            task.save()
+            task.name = 'Renamed'
+            task.save()
+        self.assertEqual(self.events(self.executor, cursor, 'creator,executor,unassigned'), [
+            ('created', task.pk), ('claimed', task.pk), ('done', task.pk),
+        ])
+
+    def test_nothing_published_before_commit(self):
+        cursor = self.poll(self.executor)['cursor']
+        Task.objects.create(creator=self.creator, name='Task', cost=10, deadline=date(2024, 6, 1))
+        self.assertEqual(self.events(self.executor, cursor), [])
+
+    def test_reset(self):
+        page = self.poll(self.executor, cursor='0123abcd:5')
+        self.assertEqual(page, {'reset': True, 'cursor': f'{self.broker.id}:0', 'events': []})
+
+        # Events that left the ring buffer
+        self.broker.publish([events.task_event('created', TaskValuesSerializer().row(
+            Task(id=n, creator=self.creator, name='Task', cost=1, deadline=date(2024, 6, 1)),
+        )) for n in range(150)])
+        self.assertTrue(self.poll(self.executor, cursor=page['cursor'])['reset'])
+        self.assertEqual(len(self.poll(self.executor, cursor=f'{self.broker.id}:50')['events']), 100)
+
+    def test_invalid_query(self):
+        response = self.client.get('/api/task/events/poll/', {'filter': 'mine'}, **self.headers(self.executor))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('filter', response.json())
+        self.assertEqual(self.client.get('/api/task/events/poll/').status_code, 401)
+
+    def test_poll_waits_for_events(self):
+        subscription = events.Subscription(self.broker, self.executor.pk, ['unassigned'])
+        row = TaskValuesSerializer().row(Task(id=1, creator=self.creator, name='Task', cost=1, deadline=date(2024, 6, 1)))
+        publisher = threading.Timer(0.1, self.broker.publish, [[events.task_event('created', row)]])
+        publisher.start()
+        start = monotonic()
+        self.assertEqual(len(async_to_sync(subscription.next)(10)), 1)
+        self.assertLess(monotonic() - start, 5)
+        self.assertEqual(async_to_sync(subscription.next)(0), [])
+
+    def test_event_stream_under_wsgi(self):
+        cursor = self.poll(self.executor)['cursor']
+        self.call('post', '/api/task/create/', self.creator, data={'name': 'Task', 'cost': 10, 'deadline': '2024-06-01'})
+        response = self.client.get('/api/task/events/', {'cursor': cursor, 'timeout': 0}, **self.headers(self.executor))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        messages = response.content.decode().split('\n\n')
+        self.assertEqual(messages[0], f'retry: 1000\nid: {cursor}')
+        self.assertTrue(messages[1].startswith('event: created\ndata: {"id":'))
+        self.assertTrue(messages[1].endswith(f'\nid: {self.broker.id}:1'))
+
+    @override_settings(TASK_EVENTS={**settings.TASK_EVENTS, 'KEEPALIVE_SECONDS': 0.05, 'STREAM_SECONDS': 1})
+    async def test_event_stream_under_asgi(self):
+        response = await AsyncClient().get('/api/task/events/', headers={
+            'Authorization': f'Token {self.tokens[self.executor.pk]}', 'Last-Event-ID': f'{self.broker.id}:0',
+        })
+        self.assertTrue(response.streaming)
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), f'retry: 1000\nid: {self.broker.id}:0\n\n'.encode())
+        self.assertEqual(await anext(chunks), f': keepalive\nid: {self.broker.id}:0\n\n'.encode())
+
+        row = TaskValuesSerializer().row(Task(id=7, creator=self.creator, name='Task', cost=1, deadline=date(2024, 6, 1)))
+        self.broker.publish([events.task_event('created', row)])
+        chunk = await anext(chunks)
+        while chunk.startswith(b': keepalive'):
+            chunk = await anext(chunks)
+        self.assertEqual(
+            chunk,
+            b'event: created\ndata: {"id":7,"creator":%d,"executor":null,"name":"Task","cost":"1.00",'
+            b'"deadline":"2024-06-01","is_done":false}\nid: %s:1\n\n' % (self.creator.pk, self.broker.id.encode()),
+        )
+        # The stream ends after STREAM_SECONDS
+        self.assertTrue([chunk async for chunk in chunks])
+
+
+class ExpandUsersTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create(username='creator')
+        cls.executors = [User.objects.create(username=f'executor{n}') for n in range(5)]
+        Task.objects.bulk_create([
+            Task(creator=cls.creator, executor=cls.executors[n % 6] if n % 6 < 5 else None,
+                 name=f'Task {n}', cost=n, deadline=date(2024, 6, 1))
+            for n in range(60)
+        ])
+
+    def get(self, url, **params):
+        client = APIClient()
+        client.force_authenticate(self.creator)
+        response = client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_expanded_users(self):
+        plain = self.get('/api/task/executor/')
+        expanded = self.get('/api/task/executor/', expand='creator,executor')
+        self.assertEqual(len(expanded), 60)
+        for task, expanded_task in zip(plain, expanded):
+            self.assertEqual(expanded_task['creator'], {'id': self.creator.pk, 'username': 'creator'})
+            if task['executor'] == 'undefined':
+                self.assertEqual(expanded_task['executor'], 'undefined')
+            else:
+                executor = User.objects.get(pk=task['executor'])
+                self.assertEqual(expanded_task['executor'], {'id': executor.pk, 'username': executor.username})
+            self.assertEqual({**expanded_task, 'creator': task['creator'], 'executor': task['executor']}, task)
+
+        tasks = self.get('/api/tasks-created-by-user/', expand='executor')
+        self.assertEqual(tasks[0]['creator'], self.creator.pk)
+        self.assertEqual(tasks[5]['executor'], None)
+        self.assertEqual(tasks[0]['executor'], {'id': self.executors[0].pk, 'username': 'executor0'})
+
+    def test_constant_query_count(self):
+        client = APIClient()
+
+        def queries(**params):
+            with CaptureQueriesContext(connection) as context:
+                response = client.get('/api/task/executor/', {'expand': 'creator,executor', **params})
+                self.assertEqual(response.status_code, 200)
+                if response.streaming:
+                    # Streamed rows are read while the response is consumed
+                    b''.join(response.streaming_content)
+            return len(context)
+
+        # The rows, whatever the number of tasks and users on the page
+        self.assertEqual({queries(page_size=size) for size in (1, 10, 60)}, {1})
+        self.assertEqual(queries(), 1)
+        self.assertEqual(queries(stream=1), 1)
+
+    def test_invalid_expand(self):
+        client = APIClient()
+        client.force_authenticate(self.creator)
+        for url in ('/api/task/executor/', '/api/task/executor/?stream=1', '/api/async/task/executor/'):
+            response = client.get(url, {'expand': 'creator,password'})
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn('expand', response.json())
+
+
+class SparseFieldsetsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create(username='creator')
+        cls.executor = User.objects.create(username='executor')
+        Task.objects.bulk_create([
+            Task(creator=cls.creator, executor=cls.executor if n % 2 else None,
+                 name=f'Task {n}', cost=n, deadline=date(2024, 6, 1 + n % 5))
+            for n in range(20)
+        ])
+
+    def get(self, url, user=None, **params):
+        client = APIClient()
+        client.force_authenticate(user or self.creator)
+        response = client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            return json.loads(b''.join(response.streaming_content))
+        return response.json()
+
+    def test_fields_of_every_list(self):
+        fields = ['executor', 'name', 'cost', 'deadline']
+        for url, user in (
+            ('/api/tasks-created-by-user/', self.creator),
+            ('/api/task/executor/', self.creator),
+            ('/api/user-tasks/', self.executor),
+            ('/api/unassigned-tasks/', self.creator),
+            ('/api/async/task/executor/', self.creator),
+        ):
+            tasks = self.get(url, user)
+            sparse = self.get(url, user, fields='deadline,executor,name,cost')
+            self.assertEqual(sparse, [{field: task[field] for field in fields} for task in tasks], url)
+            self.assertEqual(list(sparse[0]), fields)
+
+    def test_columns_read(self):
+        with CaptureQueriesContext(connection) as context:
+            tasks = self.get('/api/task/executor/', fields='name,cost')
+        self.assertEqual(tasks[0], {'name': 'Task 0', 'cost': '0.00'})
+        select = context.captured_queries[-1]['sql']
+        self.assertIn('"api_task"."name"', select)
+        for column in ('"api_task"."id"', 'creator_id', 'executor_id', 'deadline', 'is_done'):
+            self.assertNotIn(column, select.split(' FROM ')[0])
+
+    def test_pages_without_their_ordering_fields(self):
+        for ordering in ('id', 'deadline'):
+            names = [task['name'] for task in self.get('/api/task/executor/', ordering=ordering, page_size=100)['results']]
+            page, paged = self.get('/api/task/executor/', fields='name', ordering=ordering, page_size=3), []
+            while True:
+                paged += page['results']
+                if page['next'] is None:
+                    break
+                page = self.get(page['next'])
+            self.assertEqual(paged, [{'name': name} for name in names])
+
+    def test_with_expand_and_streams(self):
+        executors = dict(Task.objects.values_list('id', 'executor_id'))
+        tasks = self.get('/api/task/executor/', fields='id,executor', expand='creator,executor')
+        expanded = {'id': self.executor.pk, 'username': 'executor'}
+        self.assertEqual(tasks, [
+            {'id': task['id'], 'executor': expanded if executors[task['id']] else 'undefined'} for task in tasks
+        ])
+        self.assertEqual(len(tasks), 20)
+
+        expected = [{'id': task_id, 'is_done': False} for task_id in sorted(executors)]
+        self.assertEqual(self.get('/api/task/executor/', fields='id,is_done', stream=1), expected)
+        response = APIClient().get('/api/task/executor/', {'fields': 'id,is_done'}, HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual([json.loads(line) for line in b''.join(response.streaming_content).splitlines()], expected)
+
+    def test_invalid_fields(self):
+        client = APIClient()
+        # The async lists only take token authentication
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.creator).key}')
+        for url in ('/api/tasks-created-by-user/', '/api/task/executor/?stream=1', '/api/async/user-tasks/'):
+            response = client.get(url, {'fields': 'name,password'})
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn('fields', response.json())
@@ -1,12 +1,33 @@
 from django.urls import path
 from .views import *
+from .async_views import *
 
 urlpatterns = [
     path('user/create/', UserCreateView.as_view(), name='user_create'),
+    path('auth/token-cache/', TokenCacheStatsView.as_view(), name='token_cache_stats'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('clear_db/', ClearDatabaseView.as_view(), name='clear_db'),
     path('login/', LoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('task/create/', TaskCreateView.as_view(), name='task_create'),
+    path('task/bulk-create/', TaskBulkCreateView.as_view(), name='task_bulk_create'),
     path('tasks-created-by-user/', TasksCreatedByUser.as_view(), name='user_tasks'),
+    path('tasks-created-by-user/changes/', TasksCreatedByUserChangesAPIView.as_view(), name='user_task_changes'),
     path('task/executor/', TaskWithExecutorAPIView.as_view(), name='task_executor'),
+    path('task/executor/changes/', TaskChangesAPIView.as_view(), name='task_changes'),
+    path('user-tasks-stats/', UserTasksStatsAPIView.as_view(), name='user-tasks-stats'),
+    path('unassigned-tasks/', UnassignedTasksAPIView.as_view(), name='unassigned-tasks'),
+    path('user-tasks/', UserTasksAPIView.as_view(), name='my-tasks'),
+    path('become-executor/<int:task_id>/', BecomeExecutorAPIView.as_view(), name='become-executor'),
+    path('mark-task-done/<int:task_id>/', MarkTaskDoneAPIView.as_view(), name='mark-task-done'),
+    path('task/bulk-become-executor/', TaskBulkBecomeExecutorView.as_view(), name='task_bulk_become_executor'),
+    path('task/bulk-mark-done/', TaskBulkMarkDoneView.as_view(), name='task_bulk_mark_done'),
+    # Push notifications of task events: server-sent events and long-poll
+    path('task/events/', TaskEventStreamView.as_view(), name='task_events'),
+    path('task/events/poll/', TaskEventPollView.as_view(), name='task_events_poll'),
+    # Async versions of the read-only lists, for ASGI deployments
+    path('async/tasks-created-by-user/', AsyncTasksCreatedByUser.as_view(), name='async_user_tasks'),
+    path('async/task/executor/', AsyncTaskWithExecutorAPIView.as_view(), name='async_task_executor'),
+    path('async/user-tasks/', AsyncUserTasksAPIView.as_view(), name='async-my-tasks'),
+    path('async/unassigned-tasks/', AsyncUnassignedTasksAPIView.as_view(), name='async-unassigned-tasks'),
 ]
\ No newline at end of file
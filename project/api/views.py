@@ -1,14 +1,35 @@
 from django.contrib.auth import authenticate, logout
+from django.conf import settings
 from django.contrib.auth.models import User
-from .models import Task 
-from .serializers import TaskSerializer
+from django.db import transaction
+from django.db.models import Count, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.http import StreamingHttpResponse
+from .authentication import CachedTokenAuthentication, token_cache
+from .changes import read_changes, record_changes
+from .events import CLAIMED, CREATED, notify_tasks
+from .conditional import list_etag, list_validators, not_modified, set_validators
+from .models import Task, UserTaskStats
+from .serializers import (
+    BulkTaskSerializer, TaskChangesQuerySerializer, TaskIdListSerializer, TaskListQuerySerializer, TaskSerializer,
+    TaskValuesSerializer,
+)
+from .stats import add_task, apply_deltas, new_deltas, record_created
+from .task_actions import NOT_AUTHORIZED, NOT_FOUND, claim_tasks, mark_tasks_done
+from .metrics import registry, render_counters
+from .pagination import TaskKeysetPagination
+from .reset import reset_database
+from .response_cache import GLOBAL, creator_scope, executor_scope, response_cache
+from .renderers import NDJSONRenderer, PrometheusTextRenderer, iter_json_array, iter_ndjson
 from rest_framework.authtoken.models import Token
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.generics import ListAPIView
+from rest_framework.settings import api_settings
 
 """
 UserCreateView allows for the creation of a user
@@ -53,6 +74,15 @@ class LoginView(APIView):
         username = request.data.get('username')
         password = request.data.get('password')
 
+        # On request, hand back a still valid token without hashing the password again
+        if request.data.get('check_token') in (True, 'true', '1'):
+            token = self.get_valid_token(request, username)
+            if token:
+                return Response(
+                    {'token': token.key},
+                    status=status.HTTP_200_OK
+                )
+
         # Authenticate the user
         user = authenticate(request, username=username, password=password)
 
@@ -73,10 +103,20 @@ class LoginView(APIView):
             {'error': 'Invalid credentials'},
             status=status.HTTP_401_UNAUTHORIZED
         )
+
+    def get_valid_token(self, request, username):
+        # The token sent in the Authorization header, if it is valid and belongs to `username`
+        try:
+            authenticated = CachedTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        if authenticated and authenticated[0].get_username() == username:
+            return authenticated[1]
+        return None
         
 class LogoutView(APIView):
     # token-based authentication explicitly used
-    authentication_classes = [TokenAuthentication] 
+    authentication_classes = [CachedTokenAuthentication] 
     # Ensure the user must be authenticated to access this view
     permission_classes = [IsAuthenticated]
     
@@ -110,7 +150,7 @@ class LogoutView(APIView):
             )
         
 class TaskCreateView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -145,8 +185,9 @@ class TaskCreateView(APIView):
 
         # Validate the serializer and check for errors
         if serializer.is_valid():
-            # Save the task to the database
-            task = serializer.save(creator=creator)
+            # Save the task to the database, together with the creator's and executor's stats
+            with transaction.atomic():
+                task = serializer.save(creator=creator)
             # Return the created task data with a 201 status code
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         else:
@@ -155,45 +196,419 @@ class TaskCreateView(APIView):
             # Return validation errors if the data is invalid
             return Response(errors, status=status.HTTP_400_BAD_REQUEST)
         
-class TasksCreatedByUser(APIView):
+class TaskBulkCreateView(APIView):
+    """
+    This view creates many tasks from a JSON array in one request.
+    Invalid items are reported by index while the valid ones are still created,
+    unless ?atomic=true is given: then nothing is created if any item is invalid.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if not isinstance(request.data, list):
+            return Response({'error': 'Expected a list of tasks'}, status=status.HTTP_400_BAD_REQUEST)
+
+        atomic = request.query_params.get('atomic') in ('1', 'true')
+        context = {'request': request, 'batch_size': settings.TASK_BULK_CREATE_BATCH_SIZE}
+
+        # Validate every task at once
+        serializer = BulkTaskSerializer(data=request.data, many=True, context=context)
+        errors = []
+        if not serializer.is_valid():
+            errors = [
+                {'index': index, 'errors': item_errors}
+                for index, item_errors in enumerate(serializer.errors) if item_errors
+            ]
+            if atomic:
+                return Response({'created': [], 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Keep going with the valid tasks only
+            valid = [item for item, item_errors in zip(request.data, serializer.errors) if not item_errors]
+            serializer = BulkTaskSerializer(data=valid, many=True, context=context)
+            serializer.is_valid(raise_exception=True)
+
+        # bulk_create skips the signals, so the stats are updated here in the same transaction
+        with transaction.atomic():
+            tasks = serializer.save()
+            record_created(tasks)
+            record_changes([task.pk for task in tasks])
+            response_cache.tasks_changed(
+                creator_ids={task.creator_id for task in tasks}, executor_ids={task.executor_id for task in tasks},
+            )
+            notify_tasks(CREATED, [TaskValuesSerializer().row(task) for task in tasks])
+
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif tasks:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'created': serializer.data, 'errors': errors}, status=response_status)
+
+class TaskListMixin:
+    """
+    Shared list logic of the task list views. Rows are serialized with the
+    TaskValuesSerializer fast path and, when the view has a pagination_class and
+    the client asks for it, one keyset page at a time. Responses carry an ETag,
+    and If-None-Match requests for an unchanged list get 304 Not Modified.
+    ?expand=creator,executor embeds {"id": ..., "username": ...} instead of the
+    user IDs, read by joins of the same query, and ?fields= narrows both the
+    tasks sent and the columns read to the given fields.
+    """
+    pagination_class = None
+    undefined_executor = False  # Replace a missing executor with "undefined"
+    replica_reads = True  # GET queries may be served by a read replica, see db_routers.py
+    cache_key = None
+
+    def get_cache_scope(self, request):
+        # The response_cache scope of the list, None to never cache it
+        return None
+
+    def get_task_serializer(self, request, keys=()):
+        # The rows serializer of the representation the query parameters ask for
+        query = TaskListQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return TaskValuesSerializer(
+            undefined_executor=self.undefined_executor,
+            expand=query.validated_data.get('expand', ()),
+            fields=query.validated_data.get('fields'),
+            keys=keys,
+        )
+
+    def list_tasks(self, request, tasks):
+        paginator = self.pagination_class() if self.pagination_class is not None else None
+        if paginator is not None and not paginator.is_requested(request):
+            paginator = None
+        # Pages are cut by their ordering fields, which are read even when not sent
+        serializer = self.get_task_serializer(request, keys=paginator.ordering_fields(request) if paginator else ())
+        # Pick the database now: responses read from a replica are not cached
+        tasks = tasks.using(tasks.db)
+        # Neither the cache scopes nor the validators follow the usernames ?expand= embeds,
+        # so expanded lists are always read and sent in full
+        scope = self.get_cache_scope(request) if not serializer.expand else None
+        if scope is not None and response_cache.usable(tasks.db):
+            self.cache_key = response_cache.response_key(request, self, scope)
+            cached = response_cache.get(self.cache_key) if self.cache_key else None
+            if cached is not None:
+                return not_modified(request, cached.get('ETag'), cached) or cached
+
+        # Validate the client's copy before reading any task, see conditional.py
+        etag = last_modified = None
+        if not serializer.expand:
+            count, last_modified = list_validators(tasks)
+            etag = list_etag(request, count, last_modified)
+            response = not_modified(request, etag)
+            if response is not None:
+                return response
+
+        rows = serializer.rows(tasks)
+
+        # Return a single page when the client asks for pagination
+        if paginator is not None:
+            page = paginator.paginate_queryset(rows, request, view=self)
+            response = paginator.get_paginated_response(serializer.serialize(page))
+        else:
+            response = Response(serializer.serialize(rows), status=status.HTTP_200_OK)
+        return set_validators(response, etag, last_modified) if etag is not None else response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.cache_key and isinstance(response, Response) and response.status_code == status.HTTP_200_OK:
+            response_cache.set(self.cache_key, response)
+        return response
+
+class TasksCreatedByUser(TaskListMixin, APIView):
     """
     This view returns all tasks created by the authenticated user.
     """
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]  # Ensure only authenticated users can access this view
+    pagination_class = TaskKeysetPagination  # Only used when ?page_size= or ?cursor= is given
 
     def get(self, request):
 
         # Filter tasks where the creator is the current authenticated user
         tasks = Task.objects.filter(creator=request.user)
-        serializer = TaskSerializer(tasks, many=True)
 
         # Return the serialized data as a JSON response
-        return Response(serializer.data,status=status.HTTP_200_OK)
+        return self.list_tasks(request, tasks)
+
+    def get_cache_scope(self, request):
+        return creator_scope(request.user.pk)
     
-class TaskWithExecutorAPIView(ListAPIView):
+class TaskWithExecutorAPIView(TaskListMixin, ListAPIView):
     """
     API view to return a list of all tasks, replacing the executor with 'undefined' 
     if no executor is assigned.
+
+    With ?stream=1 (JSON array) or Accept: application/x-ndjson the tasks are
+    streamed row by row from a server-side cursor instead of being built in memory.
     """
     queryset = Task.objects.all()  # Fetch all tasks
     serializer_class = TaskSerializer
-
+    pagination_class = TaskKeysetPagination  # Only used when ?page_size= or ?cursor= is given
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+    undefined_executor = True
+    stream_chunk_size = 2000  # Rows fetched from the database cursor at a time
 
     def list(self, request, *args, **kwargs):
-        # Get the original response from ListAPIView
-        response = super().list(request, *args, **kwargs)
-        
-        # Modify the executor field in the response if it is None
-        for task in response.data:
-            if task['executor'] is None:
-                task['executor'] = "undefined"
-        
-        return Response(response.data)
+        if isinstance(request.accepted_renderer, NDJSONRenderer):
+            return StreamingHttpResponse(iter_ndjson(self.iter_tasks()), content_type=NDJSONRenderer.media_type)
+        if request.query_params.get('stream') in ('1', 'true'):
+            return StreamingHttpResponse(iter_json_array(self.iter_tasks()), content_type='application/json')
+
+        return self.list_tasks(request, self.get_queryset())
+
+    def get_cache_scope(self, request):
+        return GLOBAL
+
+    def iter_tasks(self):
+        # Invalid query parameters must be reported before the response starts
+        serializer = self.get_task_serializer(self.request)
+        # The rows are read after the response left the middleware, so pick the database now
+        tasks = self.get_queryset().order_by('id')
+        tasks = tasks.using(tasks.db)
+        return self.serialize_rows(tasks, serializer)
+
+    def serialize_rows(self, tasks, serializer):
+        # Serialize one task at a time so memory stays flat for any number of tasks
+        for row in serializer.rows(tasks).iterator(chunk_size=self.stream_chunk_size):
+            yield serializer.to_representation(row)
+
+class TaskChangesMixin:
+    """
+    Shared logic of the change feeds: the tasks of a list changed after the
+    client's ?since= cursor, see changes.py. The response is
+    {"reset": ..., "cursor": ..., "more": ..., "changes": [...]}.
+    """
+    undefined_executor = False  # The representation of the list the feed follows
+
+    def get(self, request):
+        serializer = TaskChangesQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        page = read_changes(
+            serializer.validated_data.get('since'),
+            creator_id=self.get_creator_id(request),
+            undefined_executor=self.undefined_executor,
+            limit=serializer.validated_data.get('page_size'),
+        )
+        return Response(page._asdict(), status=status.HTTP_200_OK)
+
+    def get_creator_id(self, request):
+        # Only follow the tasks of this creator, None for all tasks
+        return None
+
+class TaskChangesAPIView(TaskChangesMixin, APIView):
+    """
+    This view returns the changes of the tasks listed by TaskWithExecutorAPIView.
+    """
+    undefined_executor = True
+
+class TasksCreatedByUserChangesAPIView(TaskChangesMixin, APIView):
+    """
+    This view returns the changes of the tasks created by the authenticated user.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_creator_id(self, request):
+        return request.user.pk
+
+class UserTasksAPIView(TaskListMixin, APIView):
+    """
+    This view returns all tasks where the authenticated user is the executor.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        tasks = Task.objects.filter(executor=request.user).order_by('id')
+        return self.list_tasks(request, tasks)
+
+    def get_cache_scope(self, request):
+        return executor_scope(request.user.pk)
+
+class UnassignedTasksAPIView(TaskListMixin, APIView):
+    """
+    This view returns all tasks without an executor, cheapest first.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        tasks = Task.objects.filter(executor__isnull=True).order_by('cost', 'id')
+        return self.list_tasks(request, tasks)
+
+    def get_cache_scope(self, request):
+        return GLOBAL
+
+class UserTasksStatsAPIView(APIView):
+    """
+    This view returns task statistics of the authenticated user.
+    The counters are read from UserTaskStats with a primary-key lookup; overdue tasks
+    depend on today's date and are counted by an indexed subquery of the same query.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    replica_reads = True  # GET queries may be served by a read replica, see db_routers.py
+
+    def get(self, request):
+        overdue = (
+            Task.objects.filter(creator=request.user, is_done=False, deadline__lt=timezone.localdate())
+            .order_by().values('creator').annotate(count=Count('id')).values('count')
+        )
+        row = (
+            UserTaskStats.objects.filter(pk=request.user.pk)
+            .annotate(overdue_tasks=Coalesce(Subquery(overdue), 0))
+            .first()
+        )
+
+        # Users without a stats row have never created or been assigned a task
+        stats = {
+            'completed_tasks': row.completed_tasks if row else 0,
+            'pending_tasks': row.pending_tasks if row else 0,
+            'overdue_tasks': row.overdue_tasks if row else 0,
+            'assigned_tasks': row.assigned_tasks if row else 0,
+            # Return the totals as numbers rather than decimal strings
+            'total_earned': float(row.total_earned) if row else 0.0,
+            'total_spent': float(row.total_spent) if row else 0.0,
+        }
+
+        return Response(stats, status=status.HTTP_200_OK)
+
+class BecomeExecutorAPIView(APIView):
+    """
+    This view assigns the authenticated user as the executor of a task.
+
+    The task is claimed with a single conditional UPDATE, so when several users
+    claim the same task at once exactly one of them gets it. A successful claim
+    then reads the task once, for the stats, its event and the lists to invalidate;
+    a failed one to tell which error to return.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def patch(self, request, task_id):
+        task = Task.objects.filter(pk=task_id)
+
+        with transaction.atomic():
+            claimed = task.filter(executor__isnull=True).exclude(creator=request.user).update(
+                executor=request.user, updated_at=timezone.now(),
+            )
+            if claimed:
+                row = TaskValuesSerializer().rows(task).get()
+                deltas = new_deltas()
+                add_task(deltas, row.creator_id, None, row.cost, row.is_done, sign=-1)
+                add_task(deltas, row.creator_id, row.executor_id, row.cost, row.is_done)
+                apply_deltas(deltas)
+                record_changes([task_id])
+                response_cache.tasks_changed(creator_ids=[row.creator_id], executor_ids=[request.user.pk])
+                notify_tasks(CLAIMED, [row])
+                return Response({'message': 'You have been assigned as the executor of the task'}, status=status.HTTP_200_OK)
+
+        state = task.values_list('creator_id', 'executor_id').first()
+        if state is None:
+            return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
+        if state[0] == request.user.pk:
+            return Response({'error': 'You cannot assign yourself as executor of your own task'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'error': 'This task already has an executor'}, status=status.HTTP_400_BAD_REQUEST)
+
+class MarkTaskDoneAPIView(APIView):
+    """
+    This view marks a task executed by the authenticated user as done and returns the task.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def patch(self, request, task_id):
+        outcomes, rows = mark_tasks_done([task_id], request.user)
+
+        if outcomes[task_id] == NOT_FOUND:
+            return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
+        if outcomes[task_id] == NOT_AUTHORIZED:
+            return Response({'error': 'You are not authorized to mark this task as done'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(TaskValuesSerializer().to_representation(rows[task_id]), status=status.HTTP_200_OK)
+
+class TaskBatchMixin:
+    """
+    Shared logic of the batch task views: they take {"ids": [...]} and return the
+    outcome of every ID, in the order given, with a single response.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def patch(self, request):
+        serializer = TaskIdListSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # Drop duplicate IDs, keeping the first occurrence
+        task_ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        outcomes = self.apply(task_ids, request.user)
+        results = [{'id': task_id, 'outcome': outcome} for task_id, outcome in outcomes.items()]
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    def apply(self, task_ids, user):
+        raise NotImplementedError
+
+class TaskBulkMarkDoneView(TaskBatchMixin, APIView):
+    """
+    This view marks many tasks executed by the authenticated user as done with one UPDATE.
+    Outcomes: done, not_found, not_authorized.
+    """
+
+    def apply(self, task_ids, user):
+        return mark_tasks_done(task_ids, user)[0]
+
+class TaskBulkBecomeExecutorView(TaskBatchMixin, APIView):
+    """
+    This view assigns the authenticated user as the executor of many tasks with one UPDATE.
+    Outcomes: assigned, not_found, own_task, already_assigned.
+    """
+
+    def apply(self, task_ids, user):
+        return claim_tasks(task_ids, user)
+
+class TokenCacheStatsView(APIView):
+    """
+    This view returns the hit/miss counters of this process' token authentication cache.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(token_cache.stats(), status=status.HTTP_200_OK)
+
+class MetricsView(APIView):
+    """
+    This view returns the request metrics and the token and response cache counters
+    of this process in the Prometheus text format.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAdminUser]
+    renderer_classes = [PrometheusTextRenderer]
+
+    def get(self, request):
+        cache = token_cache.stats()
+        counters = render_counters({
+            'size': ('gauge', 'Tokens in the token cache', cache['size']),
+            'max_size': ('gauge', 'Capacity of the token cache', cache['max_size']),
+            'hits_total': ('counter', 'Token lookups served by this process', cache['hits']),
+            'shared_hits_total': ('counter', 'Token lookups served by the shared cache', cache['shared_hits']),
+            'misses_total': ('counter', 'Token lookups that read the database', cache['misses']),
+        }, prefix='api_token_cache_')
+        responses = response_cache.stats()
+        counters += render_counters({
+            'hits_total': ('counter', 'Task list responses served from the response cache', responses['hits']),
+            'misses_total': ('counter', 'Task list responses built from the database', responses['misses']),
+        }, prefix='api_response_cache_')
+        return Response(registry.render() + counters, status=status.HTTP_200_OK)
 
 class ClearDatabaseView(APIView):    
-    #get method to clear data    
+    #get method to clear data, emptying the tables without loading their rows
     def get(self, request):
-        Task.objects.all().delete()
-        User.objects.all().delete()
+        reset_database()
         return Response({'message': 'All data cleared successfully'}, status=200)
\ No newline at end of file
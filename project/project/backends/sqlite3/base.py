@@ -0,0 +1,43 @@
+"""
+SQLite backend that applies PRAGMAs to every new connection and can start
+transactions with BEGIN IMMEDIATE.
+
+Two extra keys are read from OPTIONS (Django 5.1 has built-in equivalents, 5.0 doesn't):
+
+- `pragmas`: dict of PRAGMA name -> value, e.g. {'journal_mode': 'WAL'}
+- `transaction_mode`: 'DEFERRED' (SQLite's default), 'IMMEDIATE' or 'EXCLUSIVE'.
+  With IMMEDIATE, a transaction.atomic() block takes the write lock when it
+  starts, so concurrent writers wait for busy_timeout instead of failing with
+  "database is locked" when a read lock can't be upgraded.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = dict(options.get('pragmas', {}))
+        self.transaction_mode = options.get('transaction_mode', 'DEFERRED').upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"settings.DATABASES is improperly configured. transaction_mode must be one of {', '.join(TRANSACTION_MODES)}."
+            )
+
+        kwargs = super().get_connection_params()
+        kwargs.pop('pragmas', None)
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,113 @@
+"""
+Database settings built from environment variables, so that the database can be
+changed without editing settings.py.
+
+DATABASE_ENGINE selects the profile:
+
+- `sqlite` (default): the file in DATABASE_NAME (db.sqlite3 by default) with WAL
+  journaling, synchronous=NORMAL, a busy timeout, a 64 MB page cache and
+  BEGIN IMMEDIATE transactions, see project/backends/sqlite3/base.py.
+- `postgresql`: DATABASE_NAME, DATABASE_USER, DATABASE_PASSWORD, DATABASE_HOST
+  and DATABASE_PORT (needs psycopg), with persistent connections (DATABASE_CONN_MAX_AGE seconds,
+  600 by default) checked before reuse. With DATABASE_POOL_MAX_SIZE set,
+  connections come from a psycopg pool instead, which needs Django 5.1+.
+
+DATABASE_REPLICAS adds read replicas, named replica1, replica2...: a comma-separated
+list of SQLite files, or of PostgreSQL `host[:port]`, that share the other
+settings of the primary. See api/db_routers.py for how reads are routed to them.
+"""
+
+import os
+
+import django
+from django.core.exceptions import ImproperlyConfigured
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms
+    'cache_size': -64000,  # negative values are in KiB
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_config(base_dir, env):
+    return {
+        'ENGINE': 'project.backends.sqlite3',
+        'NAME': env.get('DATABASE_NAME', base_dir / 'db.sqlite3'),
+        'OPTIONS': {
+            'pragmas': SQLITE_PRAGMAS,
+            'transaction_mode': env.get('DATABASE_TRANSACTION_MODE', 'IMMEDIATE'),
+        },
+    }
+
+
+def postgresql_config(base_dir, env):
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': env.get('DATABASE_NAME', 'task_management'),
+        'USER': env.get('DATABASE_USER', ''),
+        'PASSWORD': env.get('DATABASE_PASSWORD', ''),
+        'HOST': env.get('DATABASE_HOST', ''),
+        'PORT': env.get('DATABASE_PORT', ''),
+        'CONN_MAX_AGE': int(env.get('DATABASE_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+    if env.get('DATABASE_POOL_MAX_SIZE'):
+        if django.VERSION < (5, 1):
+            raise ImproperlyConfigured(
+                f'DATABASE_POOL_MAX_SIZE needs Django 5.1 or later, this is {django.get_version()}'
+            )
+        # The pool manages the connections itself, which is incompatible with persistent connections
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': int(env.get('DATABASE_POOL_MIN_SIZE', 2)),
+            'max_size': int(env['DATABASE_POOL_MAX_SIZE']),
+            'timeout': int(env.get('DATABASE_POOL_TIMEOUT', 10)),
+        }
+    return config
+
+
+def replica_configs(base_dir, env, default):
+    """
+    Return the settings of the DATABASE_REPLICAS replicas of the `default` database.
+    """
+    replicas = {}
+    for number, location in enumerate(filter(None, env.get('DATABASE_REPLICAS', '').split(',')), 1):
+        config = {**default, 'OPTIONS': dict(default['OPTIONS']), 'TEST': {'MIRROR': 'default'}}
+        location = location.strip()
+        if default['ENGINE'] == 'project.backends.sqlite3':
+            config['NAME'] = base_dir / location
+            # Refuse writes; a read-only connection has no use for BEGIN IMMEDIATE
+            config['OPTIONS']['pragmas'] = {**SQLITE_PRAGMAS, 'query_only': 1}
+            config['OPTIONS']['transaction_mode'] = 'DEFERRED'
+        else:
+            config['HOST'], _, port = location.partition(':')
+            config['PORT'] = port or default['PORT']
+        replicas[f'replica{number}'] = config
+    return replicas
+
+
+PROFILES = {
+    'sqlite': sqlite_config,
+    'postgresql': postgresql_config,
+}
+
+
+def database_config(base_dir, env=os.environ):
+    """
+    Return the settings of the default database for the DATABASE_ENGINE profile.
+    """
+    engine = env.get('DATABASE_ENGINE', 'sqlite')
+    if engine not in PROFILES:
+        raise ImproperlyConfigured(f"Unknown DATABASE_ENGINE {engine!r}, expected one of {', '.join(PROFILES)}")
+    return PROFILES[engine](base_dir, env)
+
+
+def database_configs(base_dir, env=os.environ):
+    """
+    Return the DATABASES setting: the default database and its replicas.
+    """
+    default = database_config(base_dir, env)
+    return {'default': default, **replica_configs(base_dir, env, default)}
@@ -10,8 +10,14 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
+from .database import database_configs
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'project.urls'
@@ -75,12 +83,21 @@ WSGI_APPLICATION = 'project.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
+# Configured with the DATABASE_* environment variables, see project/database.py
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+DATABASES = database_configs(BASE_DIR)
+
+DATABASE_ROUTERS = ['api.db_routers.ReplicaRouter']
+
+# Reads of views with `replica_reads = True`, see api/db_routers.py
+REPLICA_ROUTING = {
+    'REPLICAS': [alias for alias in DATABASES if alias != 'default'],
+    'MODELS': ['api.Task', 'api.UserTaskStats'],  # Models read from the replicas
+    'SELECTION': os.environ.get('DATABASE_REPLICA_SELECTION', 'round_robin'),  # or 'least_lag'
+    'READ_YOUR_WRITES': 5,  # seconds a user reads from the primary after writing
+    'MAX_LAG': 30,  # seconds behind the primary after which a replica is skipped
+    'LAG_CHECK_INTERVAL': 5,  # seconds
+    'CACHE_ALIAS': 'default',  # where the read-your-writes pins are kept, shared by the processes
 }
 
 
@@ -103,6 +120,33 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# PASSWORD_HASHER (pbkdf2, scrypt or argon2) picks the hasher for new passwords. The
+# others still verify existing hashes, which are upgraded on the user's next login.
+# argon2 needs the argon2-cffi package. See api/hashers.py
+
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'scrypt')
+
+PASSWORD_HASHER_PARAMS = {
+    'scrypt': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1},
+    'argon2': {'time_cost': 2, 'memory_cost': 19456, 'parallelism': 1},
+}
+
+_PASSWORD_HASHERS = {
+    'scrypt': 'api.hashers.TunedScryptPasswordHasher',
+    'argon2': 'api.hashers.TunedArgon2PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+
+if PASSWORD_HASHER not in _PASSWORD_HASHERS:
+    raise ImproperlyConfigured(
+        f"Unknown PASSWORD_HASHER {PASSWORD_HASHER!r}, expected one of {', '.join(_PASSWORD_HASHERS)}"
+    )
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+]
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -124,3 +168,96 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Django REST framework
+# JSON is encoded and decoded with orjson when it is installed (same output as
+# DRF's JSONRenderer), see api/renderers.py and api/parsers.py
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+
+# Task API
+# Rows inserted per INSERT statement by task/bulk-create/
+TASK_BULK_CREATE_BATCH_SIZE = 500
+# Task IDs accepted by one task/bulk-mark-done/ or task/bulk-become-executor/ request
+TASK_BATCH_MAX_SIZE = 1000
+
+# Change feed of the tasks, see api/changes.py
+TASK_CHANGES = {
+    'PAGE_SIZE': 1000,  # changes read by one request at most
+    # The cursor sent to clients stays behind changes younger than this, which may
+    # still have lower sequence numbers than changes of uncommitted transactions
+    'SETTLE_SECONDS': 2,
+    'PRUNE_DAYS': 7,  # default age of the changes deleted by prune_task_changes
+}
+
+# Push notifications of task events, see api/events.py
+TASK_EVENTS = {
+    # Broker of the events; LocalBroker only reaches the subscribers of its own process
+    'BROKER': 'api.events.LocalBroker',
+    'OPTIONS': {'size': 10000},  # events kept for subscribers that reconnect
+    'POLL_SECONDS': 25,  # longest wait of a long-poll request
+    'KEEPALIVE_SECONDS': 15,  # comment sent on an idle event stream
+    'STREAM_SECONDS': 300,  # an event stream is closed after this, clients reconnect
+    'RETRY_MILLISECONDS': 1000,  # reconnection delay asked of EventSource clients
+}
+
+# Token authentication cache, see api/authentication.py
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,  # seconds
+    'CACHE_ALIAS': None,  # a Django cache alias to share entries between processes
+}
+
+# Per-view request metrics, see api/metrics.py. They are served by metrics/
+REQUEST_METRICS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,  # Send Server-Timing headers with the app and database time
+    'BUCKETS': {
+        'duration_seconds': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+        'db_queries': (0, 1, 2, 3, 5, 10, 20, 50, 100, 500),
+        'db_duration_seconds': (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+        'response_size_bytes': (100, 1000, 10000, 100000, 1000000, 10000000),
+    },
+}
+
+# Caches. "default" keeps the read-your-writes pins of api/db_routers.py and
+# "responses" the rendered task lists of api/response_cache.py: in memory by default,
+# which is only right with a single process, or with CACHE_BACKEND=file (and
+# RESPONSE_CACHE_BACKEND=file) in CACHE_LOCATION (RESPONSE_CACHE_LOCATION), shared
+# by the processes of a host
+RESPONSE_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'BACKEND': RESPONSE_CACHE_BACKENDS[os.environ.get('CACHE_BACKEND', 'locmem')],
+        'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'task-api-cache')),
+    },
+    'responses': {
+        'BACKEND': RESPONSE_CACHE_BACKENDS[RESPONSE_CACHE_BACKEND],
+        'LOCATION': os.environ.get('RESPONSE_CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'task-api-responses')),
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
+# Task list response cache, see api/response_cache.py
+RESPONSE_CACHE = {
+    # Invalidations only reach the processes sharing the cache: off on the in-memory one
+    'ENABLED': RESPONSE_CACHE_BACKEND != 'locmem',
+    'CACHE_ALIAS': 'responses',
+    'TIMEOUT': 300,  # seconds
+}
@@ -0,0 +1,248 @@
+"""
+Run the API tests in-process instead of against a live server.
+
+In "in-process" mode (the default, see MODE in configs.json or the API_TEST_MODE
+environment variable) the requests made by the tests to BASE_URL never reach the
+network: a requests transport adapter hands them to the Django app through the
+test client's WSGI handler. The app runs on a test database, with a fast password
+hasher, and every test runs in a transaction that is rolled back at the end, so
+the clear_db/ calls of the tests do not have to delete anything.
+
+Every pytest process has its own test database (an in-memory one with SQLite),
+so with pytest-xdist installed the suite can be spread over processes:
+
+    python -m pytest -n auto tests
+
+In "live" mode the tests go over HTTP to a server at BASE_URL that pytest starts
+with `manage.py runserver` on a fresh SQLite database in a temporary directory
+(API_TEST_DATABASE_NAME names the database to use with other engines, which is
+then cleared by the tests). With API_TEST_SERVER=external they go to the server
+already running at BASE_URL instead, as they do when a test file is run directly
+with unittest.
+
+Tests decorated with `markers.live_only`, such as the ones sending requests
+from several threads at once to check how the server handles the race, only run
+in "live" mode: in-process, requests are served one at a time.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+TESTS_DIR = os.path.dirname(__file__)
+PROJECT_DIR = os.path.join(os.path.dirname(TESTS_DIR), 'project')
+
+with open(os.path.join(TESTS_DIR, 'configs.json')) as f:
+    CONFIG = json.load(f)
+
+BASE_URL = CONFIG['BASE_URL']
+BASE = urlsplit(BASE_URL)
+MODE = os.environ.get('API_TEST_MODE', CONFIG.get('MODE', 'live'))
+if MODE not in ('in-process', 'live'):
+    raise ValueError(f'Unknown API test mode {MODE!r}, expected "in-process" or "live"')
+
+EXTERNAL_SERVER = os.environ.get('API_TEST_SERVER') == 'external'
+SERVER_START_TIMEOUT = 30  # seconds
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+CLEARED = b'{"message":"All data cleared successfully"}'
+
+
+class DjangoAdapter(BaseAdapter):
+    """
+    A requests transport adapter that answers requests with the Django app.
+
+    Requests are served one at a time, on the connection of the thread that
+    started the test, so the tests that send requests from several threads see
+    (and roll back) the same transaction.
+    """
+
+    def __init__(self, connection):
+        super().__init__()
+        self.connection = connection
+        self.lock = threading.Lock()
+        # Whether the current test has sent a request that may have written data
+        self.written = False
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        from django.db import connections
+        from django.test import Client
+
+        method = request.method.upper()
+        path = BASE.path + request.url[len(BASE_URL):]
+        headers = CaseInsensitiveDict(request.headers)
+        content_type = headers.pop('Content-Type', None) or 'application/octet-stream'
+        headers.pop('Content-Length', None)
+        body = request.body or b''
+        if isinstance(body, str):
+            body = body.encode()
+
+        with self.lock:
+            if path.split('?')[0] == BASE.path + 'clear_db/' and not self.written:
+                # The test database is already empty: the previous test was rolled back
+                return self.build_response(request, 200, 'OK', {'Content-Type': 'application/json'}, CLEARED)
+            if method not in SAFE_METHODS:
+                self.written = True
+
+            if connections['default'] is not self.connection:
+                connections['default'] = self.connection
+            # Absolute URLs built by the app (pagination links) point to BASE_URL
+            client = Client(raise_request_exception=False, HTTP_HOST=BASE.netloc, **{'wsgi.url_scheme': BASE.scheme})
+            response = client.generic(method, path, data=body, content_type=content_type, headers=dict(headers))
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+            response.close()
+
+        return self.build_response(request, response.status_code, response.reason_phrase, dict(response.items()), content)
+
+    def build_response(self, request, status, reason, headers, content):
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = content
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(0)
+        return response
+
+    def close(self):
+        pass
+
+
+def setup_django():
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+    import django
+    django.setup()
+
+    from django.db import connections
+    worker = os.environ.get('PYTEST_XDIST_WORKER')
+    if worker:
+        # A separate test database per pytest-xdist worker; SQLite ones are in memory
+        for connection in connections.all():
+            test = connection.settings_dict['TEST']
+            if connection.vendor != 'sqlite' and not test.get('MIRROR'):
+                test['NAME'] = f'{test.get("NAME") or "test_" + connection.settings_dict["NAME"]}_{worker}'
+
+
+@pytest.fixture(scope='session')
+def django_adapter():
+    setup_django()
+    from django.db import connections
+    from django.test.utils import (
+        override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    connection = connections['default']
+    connection.inc_thread_sharing()
+    adapter = DjangoAdapter(connection)
+    get_adapter = requests.Session.get_adapter
+
+    def django_get_adapter(session, url):
+        return adapter if url.startswith(BASE_URL) else get_adapter(session, url)
+
+    try:
+        with override_settings(
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+            ALLOWED_HOSTS=[BASE.hostname],
+        ), \
+                pytest.MonkeyPatch.context() as monkeypatch:
+            monkeypatch.setattr(requests.Session, 'get_adapter', django_get_adapter)
+            yield adapter
+    finally:
+        connection.dec_thread_sharing()
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def server_is_listening():
+    try:
+        socket.create_connection((BASE.hostname, BASE.port or 80), timeout=1).close()
+        return True
+    except OSError:
+        return False
+
+
+@pytest.fixture(scope='session', autouse=True)
+def live_server(tmp_path_factory):
+    """
+    Run the app at BASE_URL on its own database for the "live" mode.
+    """
+    if MODE != 'live' or EXTERNAL_SERVER:
+        yield
+        return
+    if server_is_listening():
+        raise RuntimeError(
+            f'A server is already listening at {BASE_URL}: stop it, or set API_TEST_SERVER=external '
+            f'to run the tests against it (they clear its database)'
+        )
+
+    directory = tmp_path_factory.mktemp('live_server')
+    env = dict(os.environ)
+    if env.get('DATABASE_ENGINE', 'sqlite') == 'sqlite':
+        env['DATABASE_NAME'] = env.get('API_TEST_DATABASE_NAME') or str(directory / 'db.sqlite3')
+    elif env.get('API_TEST_DATABASE_NAME'):
+        env['DATABASE_NAME'] = env['API_TEST_DATABASE_NAME']
+    else:
+        raise RuntimeError('Set API_TEST_DATABASE_NAME to the database the live tests may clear')
+
+    manage = [sys.executable, os.path.join(PROJECT_DIR, 'manage.py')]
+    subprocess.run([*manage, 'migrate', '-v0'], env=env, cwd=PROJECT_DIR, check=True)
+    with open(directory / 'server.log', 'wb') as log:
+        server = subprocess.Popen(
+            [*manage, 'runserver', f'{BASE.hostname}:{BASE.port or 80}', '--noreload'],
+            env=env, cwd=PROJECT_DIR, stdout=log, stderr=subprocess.STDOUT,
+        )
+    try:
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while not server_is_listening():
+            if server.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f'The live server did not start, see {directory / "server.log"}')
+            time.sleep(0.1)
+        yield
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def pytest_runtest_setup(item):
+    if MODE == 'in-process' and getattr(getattr(item, 'obj', None), 'live_only', False):
+        pytest.skip('Sends concurrent requests, which are served one at a time in-process')
+
+
+@pytest.fixture(autouse=True)
+def rollback(request):
+    if MODE != 'in-process':
+        yield
+        return
+
+    adapter = request.getfixturevalue('django_adapter')
+    from django.core.cache import caches
+    from django.db import transaction
+    from api.authentication import token_cache
+
+    token_cache.clear()
+    for cache in caches.all():
+        cache.clear()
+    adapter.written = False
+    atomic = transaction.atomic()
+    atomic.__enter__()
+    try:
+        yield
+    finally:
+        transaction.set_rollback(True)
+        atomic.__exit__(None, None, None)
@@ -0,0 +1,9 @@
+"""
+Markers shared by the test files, read by tests/conftest.py.
+"""
+
+
+def live_only(test):
+    # Skipped in "in-process" mode, where requests are served one at a time
+    test.live_only = True
+    return test
@@ -0,0 +1,96 @@
+import unittest
+import requests
+import json 
+import os
+
+def get_url():
+    config_path = os.path.join(os.path.dirname(__file__), 'configs.json')
+    with open(config_path, "r") as f:
+        return json.load(f)['BASE_URL']
+
+
+BASE_URL = get_url()
+
+class AsyncTaskViewsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clear_database()
+        self.user_id = self.create_user('test_user', 'test_password', 'test_user@example.com')
+        self.executor_id = self.create_user('executor_user', 'executor_password', 'executor@example.com')
+        self.token = self.login_user('test_user', 'test_password')
+        self.headers = {'Authorization': f'Token {self.token}'}
+        self.executor_headers = {'Authorization': f'Token {self.login_user("executor_user", "executor_password")}'}
+        self.create_task('Assigned Task', 100, '2024-06-01', self.executor_id)
+        self.create_task('Expensive Task', 300, '2024-06-10', None)
+        self.create_task('Cheap Task', 50, '2024-06-20', None)
+
+    def tearDown(self):
+        self.clear_database()
+
+    def clear_database(self):
+        response = requests.get(BASE_URL + 'clear_db/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'message': 'All data cleared successfully'})
+
+    def create_user(self, username, password, email):
+        response = requests.post(BASE_URL + 'user/create/', data={
+            'username': username,
+            'password': password,
+            'email': email
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.json().get('id')
+
+    def login_user(self, username, password):
+        response = requests.post(BASE_URL + 'login/', data={
+            'username': username,
+            'password': password
+        })
+        self.assertEqual(response.status_code, 200)
+        token = response.json().get('token')
+        self.assertIsInstance(token, str)
+        self.assertEqual(len(token), 40)
+        return token
+
+    def create_task(self, name, cost, deadline, executor_id):
+        response = requests.post(BASE_URL + 'task/create/', headers=self.headers, json={
+            'name': name,
+            'cost': cost,
+            'deadline': deadline,
+            'executor': executor_id
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.json().get('id')
+
+    def assertSameResponse(self, path, headers):
+        response = requests.get(BASE_URL + 'async/' + path, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, requests.get(BASE_URL + path, headers=headers).content)
+        return response.json()
+
+    def test_async_tasks_created_by_user(self):
+        tasks = self.assertSameResponse('tasks-created-by-user/', self.headers)
+        self.assertEqual(len(tasks), 3)
+
+    def test_async_task_with_executor(self):
+        tasks = self.assertSameResponse('task/executor/', {})
+        self.assertEqual(tasks[1]['executor'], 'undefined')
+
+    def test_async_user_tasks(self):
+        tasks = self.assertSameResponse('user-tasks/', self.executor_headers)
+        self.assertEqual([task['name'] for task in tasks], ['Assigned Task'])
+
+    def test_async_unassigned_tasks(self):
+        tasks = self.assertSameResponse('unassigned-tasks/', self.headers)
+        self.assertEqual([task['name'] for task in tasks], ['Cheap Task', 'Expensive Task'])
+
+    def test_async_unauthorized_access(self):
+        response = requests.get(BASE_URL + 'async/user-tasks/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'detail': 'Authentication credentials were not provided.'})
+
+        response = requests.get(BASE_URL + 'async/user-tasks/', headers={'Authorization': 'Token wrong_token'})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'detail': 'Invalid token.'})
+
+if __name__ == '__main__':
+    unittest.main()
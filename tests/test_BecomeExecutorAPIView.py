@@ -1,7 +1,9 @@
 import unittest
 import requests
+from concurrent.futures import ThreadPoolExecutor
 import json 
 import os
+from markers import live_only
 
 def get_url():
     config_path = os.path.join(os.path.dirname(__file__), 'configs.json')
@@ -82,5 +84,32 @@ class BecomeExecutorAPIViewTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json(), {'error': 'This task already has an executor'})
 
+    @live_only
+    def test_become_executor_concurrently(self):
+        headers = []
+        for i in range(16):
+            self.create_user(f'claimer_{i}', 'claimer_password', f'claimer_{i}@example.com')
+            headers.append({'Authorization': f'Token {self.login_user(f"claimer_{i}", "claimer_password")}'})
+
+        def claim(claimer_headers):
+            return requests.patch(BASE_URL + f'become-executor/{self.task_id}/', headers=claimer_headers)
+
+        # All users claim the same task at once: exactly one of them gets it
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            responses = list(pool.map(claim, headers))
+        statuses = sorted(response.status_code for response in responses)
+        self.assertEqual(statuses, [200] + [400] * 15)
+        for response in responses:
+            if response.status_code == 400:
+                self.assertEqual(response.json(), {'error': 'This task already has an executor'})
+
+        winners = []
+        for claimer_headers in headers:
+            tasks = requests.get(BASE_URL + 'user-tasks/', headers=claimer_headers).json()
+            stats = requests.get(BASE_URL + 'user-tasks-stats/', headers=claimer_headers).json()
+            self.assertEqual(stats['assigned_tasks'], len(tasks))
+            winners.extend(tasks)
+        self.assertEqual([task['id'] for task in winners], [self.task_id])
+
 if __name__ == '__main__':
     unittest.main()
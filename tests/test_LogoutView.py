@@ -46,5 +46,20 @@ class TestLogoutView(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {'message': 'Successfully logged out'})
 
+    def test_token_rejected_after_logout(self):
+        requests.post(BASE_URL + 'user/create/', data={'username': 'test_user', 'password': 'test_password', 'email': 'test@example.com'})
+        response = requests.post(BASE_URL + 'login/', data={'username': 'test_user', 'password': 'test_password'})
+        headers = {'Authorization': f'Token {response.json().get("token")}'}
+
+        # Use the token once so it is cached before logging out
+        response = requests.get(BASE_URL + 'tasks-created-by-user/', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        response = requests.post(BASE_URL + 'logout/', headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+        response = requests.get(BASE_URL + 'tasks-created-by-user/', headers=headers)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'detail': 'Invalid token.'})
+
 if __name__ == '__main__':
     unittest.main()
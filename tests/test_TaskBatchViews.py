@@ -0,0 +1,114 @@
+import unittest
+import requests
+import json 
+import os
+
+def get_url():
+    config_path = os.path.join(os.path.dirname(__file__), 'configs.json')
+    with open(config_path, "r") as f:
+        return json.load(f)['BASE_URL']
+
+
+BASE_URL = get_url()
+
+class TaskBatchViewsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clear_database()
+        self.user_id = self.create_user('test_user', 'test_password', 'test_user@example.com')
+        self.executor_id = self.create_user('executor_user', 'executor_password', 'executor@example.com')
+        self.token = self.login_user('test_user', 'test_password')
+        self.executor_token = self.login_user('executor_user', 'executor_password')
+        self.headers = {'Authorization': f'Token {self.token}'}
+        self.executor_headers = {'Authorization': f'Token {self.executor_token}'}
+
+    def tearDown(self):
+        self.clear_database()
+
+    def clear_database(self):
+        response = requests.get(BASE_URL + 'clear_db/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'message': 'All data cleared successfully'})
+
+    def create_user(self, username, password, email):
+        response = requests.post(BASE_URL + 'user/create/', data={
+            'username': username,
+            'password': password,
+            'email': email
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.json().get('id')
+
+    def login_user(self, username, password):
+        response = requests.post(BASE_URL + 'login/', data={
+            'username': username,
+            'password': password
+        })
+        self.assertEqual(response.status_code, 200)
+        token = response.json().get('token')
+        self.assertIsInstance(token, str)
+        self.assertEqual(len(token), 40)
+        return token
+
+    def create_tasks(self, count, executor_id=None):
+        response = requests.post(BASE_URL + 'task/bulk-create/', headers=self.headers, json=[
+            {'name': f'Task {i}', 'cost': 100, 'deadline': '2024-06-01', 'executor': executor_id} for i in range(count)
+        ])
+        self.assertEqual(response.status_code, 201)
+        return [task['id'] for task in response.json()['created']]
+
+    def test_bulk_become_executor_and_mark_done(self):
+        task_ids = self.create_tasks(3)
+        response = requests.patch(BASE_URL + 'task/bulk-become-executor/', headers=self.executor_headers, json={
+            'ids': task_ids + [999999]
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'results': [
+            {'id': task_ids[0], 'outcome': 'assigned'},
+            {'id': task_ids[1], 'outcome': 'assigned'},
+            {'id': task_ids[2], 'outcome': 'assigned'},
+            {'id': 999999, 'outcome': 'not_found'},
+        ]})
+
+        response = requests.patch(BASE_URL + 'task/bulk-mark-done/', headers=self.executor_headers, json={
+            'ids': task_ids[:2]
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['outcome'] for result in response.json()['results']], ['done', 'done'])
+
+        response = requests.get(BASE_URL + 'user-tasks-stats/', headers=self.executor_headers)
+        self.assertEqual(response.json()['assigned_tasks'], 3)
+        self.assertEqual(response.json()['total_earned'], 200.0)
+
+    def test_bulk_become_executor_refusals(self):
+        own_ids = self.create_tasks(1)
+        assigned_ids = self.create_tasks(1, self.executor_id)
+        response = requests.patch(BASE_URL + 'task/bulk-become-executor/', headers=self.headers, json={'ids': own_ids})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['outcome'] for result in response.json()['results']], ['own_task'])
+
+        response = requests.patch(BASE_URL + 'task/bulk-become-executor/', headers=self.executor_headers, json={
+            'ids': assigned_ids
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['outcome'] for result in response.json()['results']], ['already_assigned'])
+
+    def test_bulk_mark_done_not_authorized(self):
+        task_ids = self.create_tasks(2, self.executor_id)
+        response = requests.patch(BASE_URL + 'task/bulk-mark-done/', headers=self.headers, json={'ids': task_ids})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['outcome'] for result in response.json()['results']], ['not_authorized'] * 2)
+
+        response = requests.get(BASE_URL + 'user-tasks/', headers=self.executor_headers)
+        self.assertFalse(any(task['is_done'] for task in response.json()))
+
+    def test_bulk_invalid_body(self):
+        response = requests.patch(BASE_URL + 'task/bulk-mark-done/', headers=self.executor_headers, json={'ids': []})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ids', response.json())
+
+    def test_unauthorized_access(self):
+        response = requests.patch(BASE_URL + 'task/bulk-mark-done/', json={'ids': [1]})
+        self.assertEqual(response.status_code, 401)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import requests
+import json 
+import os
+
+def get_url():
+    config_path = os.path.join(os.path.dirname(__file__), 'configs.json')
+    with open(config_path, "r") as f:
+        return json.load(f)['BASE_URL']
+
+
+BASE_URL = get_url()
+
+class TaskBulkCreateViewTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clear_database()
+        self.user_id = self.create_user('test_user', 'test_password', 'test_user@example.com')
+        self.executor_id = self.create_user('executor_user', 'executor_password', 'executor@example.com')
+        self.token = self.login_user('test_user', 'test_password')
+        self.headers = {'Authorization': f'Token {self.token}'}
+
+    def tearDown(self):
+        self.clear_database()
+
+    def clear_database(self):
+        response = requests.get(BASE_URL + 'clear_db/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'message': 'All data cleared successfully'})
+
+    def create_user(self, username, password, email):
+        response = requests.post(BASE_URL + 'user/create/', data={
+            'username': username,
+            'password': password,
+            'email': email
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.json().get('id')
+
+    def login_user(self, username, password):
+        response = requests.post(BASE_URL + 'login/', data={
+            'username': username,
+            'password': password
+        })
+        self.assertEqual(response.status_code, 200)
+        token = response.json().get('token')
+        self.assertIsInstance(token, str)
+        self.assertEqual(len(token), 40)
+        return token
+
+    def get_created_tasks(self):
+        response = requests.get(BASE_URL + 'tasks-created-by-user/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_bulk_create_tasks(self):
+        response = requests.post(BASE_URL + 'task/bulk-create/', headers=self.headers, json=[
+            {'name': 'Task 1', 'cost': 100, 'deadline': '2024-06-01', 'executor': self.executor_id},
+            {'name': 'Task 2', 'cost': 150, 'deadline': '2024-06-10', 'executor': 999999},
+            {'name': 'Task 3', 'cost': 200, 'deadline': '2024-06-20'},
+        ])
+        self.assertEqual(response.status_code, 201)
+
+        created = response.json()['created']
+        self.assertEqual(response.json()['errors'], [])
+        self.assertEqual([task['name'] for task in created], ['Task 1', 'Task 2', 'Task 3'])
+        self.assertEqual(created[0]['executor'], self.executor_id)
+        self.assertEqual(created[0]['creator'], self.user_id)
+        self.assertEqual(created[0]['cost'], '100.00')
+        self.assertIsNone(created[1]['executor'])
+        self.assertEqual(len(self.get_created_tasks()), 3)
+
+    def test_bulk_create_reports_invalid_items(self):
+        response = requests.post(BASE_URL + 'task/bulk-create/', headers=self.headers, json=[
+            {'name': 'Task 1', 'cost': 100, 'deadline': '2024-06-01'},
+            {'name': 'Task 2', 'cost': 150},
+            {'name': 'Task 3', 'cost': 200, 'deadline': '2024-06-20', 'executor': self.user_id},
+        ])
+        self.assertEqual(response.status_code, 207)
+
+        data = response.json()
+        self.assertEqual([task['name'] for task in data['created']], ['Task 1'])
+        self.assertEqual([error['index'] for error in data['errors']], [1, 2])
+        self.assertIn('deadline', data['errors'][0]['errors'])
+        self.assertEqual(data['errors'][1]['errors'], {'error': ['The creator of a task cannot be its executor']})
+        self.assertEqual(len(self.get_created_tasks()), 1)
+
+    def test_bulk_create_atomic(self):
+        response = requests.post(BASE_URL + 'task/bulk-create/?atomic=true', headers=self.headers, json=[
+            {'name': 'Task 1', 'cost': 100, 'deadline': '2024-06-01'},
+            {'name': 'Task 2', 'cost': 150},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['created'], [])
+        self.assertEqual(len(self.get_created_tasks()), 0)
+
+    def test_bulk_create_expects_a_list(self):
+        response = requests.post(BASE_URL + 'task/bulk-create/', headers=self.headers, json={'name': 'Task 1'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Expected a list of tasks'})
+
+    def test_unauthorized_access(self):
+        response = requests.post(BASE_URL + 'task/bulk-create/', json=[])
+        self.assertEqual(response.status_code, 401)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 import unittest
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import json 
 import os
+from markers import live_only
 
 def get_url():
     config_path = os.path.join(os.path.dirname(__file__), 'configs.json')
@@ -147,5 +149,30 @@ class TestTaskCreateView(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertIn('deadline', response.json())
 
+    @live_only
+    def test_create_task_concurrently(self):
+        self.clear_database()
+        result = self.create_test_users()
+        token = self.login_user('creator_user', 'creator_password')
+        headers = {'Authorization': f'Token {token}'}
+        deadline = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
+
+        def create(i):
+            return requests.post(BASE_URL + 'task/create/', headers=headers, json={
+                'executor': result[1],
+                'name': f'Task {i}',
+                'cost': 100,
+                'deadline': deadline
+            }).status_code
+
+        # Concurrent writes must wait for each other rather than fail with "database is locked"
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            statuses = list(pool.map(create, range(40)))
+        self.assertEqual(statuses, [201] * 40)
+
+        response = requests.get(BASE_URL + 'tasks-created-by-user/', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 40)
+
 if __name__ == '__main__':
     unittest.main()
@@ -81,5 +81,38 @@ class TaskWithExecutorAPITestCase(unittest.TestCase):
         self.assertEqual(tasks[1]['deadline'], '2024-06-01')
         self.assertEqual(tasks[1]['executor'], 'undefined')
 
+    def test_get_tasks_paginated_by_deadline(self):
+        self.create_task('Early Task', 100, '2024-05-01', None)
+
+        response = requests.get(BASE_URL + 'task/executor/?page_size=2&ordering=deadline')
+        self.assertEqual(response.status_code, 200)
+        page = response.json()
+        self.assertEqual(len(page['results']), 2)
+        self.assertEqual(page['results'][0]['name'], 'Early Task')
+        self.assertEqual(page['results'][0]['executor'], 'undefined')
+
+        response = requests.get(page['next'])
+        self.assertEqual(response.status_code, 200)
+        page = response.json()
+        self.assertEqual(len(page['results']), 1)
+        self.assertEqual(page['results'][0]['id'], self.task_id_2)
+        self.assertEqual(page['results'][0]['executor'], 'undefined')
+        self.assertIsNone(page['next'])
+
+    def test_stream_tasks_as_json_array(self):
+        response = requests.get(BASE_URL + 'task/executor/?stream=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), requests.get(BASE_URL + 'task/executor/').json())
+
+    def test_stream_tasks_as_ndjson(self):
+        response = requests.get(BASE_URL + 'task/executor/', headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'application/x-ndjson')
+
+        tasks = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(len(tasks), 2)
+        self.assertEqual(tasks[0]['id'], self.task_id_1)
+        self.assertEqual(tasks[1]['executor'], 'undefined')
+
 if __name__ == '__main__':
     unittest.main()
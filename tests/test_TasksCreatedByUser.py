@@ -1,5 +1,6 @@
 import unittest
 import requests
+import base64
 import json 
 import os
 
@@ -73,6 +74,40 @@ class TasksCreatedByUserTestCase(unittest.TestCase):
         self.assertEqual(tasks[0]['cost'], '100.00')
         self.assertEqual(tasks[0]['deadline'], '2024-06-01')
 
+    def test_get_tasks_created_by_user_paginated(self):
+        for name in ('Task 1', 'Task 2', 'Task 3'):
+            self.create_task(name=name, cost=100, deadline='2024-06-01')
+
+        response = requests.get(BASE_URL + 'tasks-created-by-user/?page_size=2', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        page = response.json()
+        self.assertEqual([task['name'] for task in page['results']], ['Task 1', 'Task 2'])
+        self.assertIsNotNone(page['next'])
+
+        response = requests.get(page['next'], headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        page = response.json()
+        self.assertEqual([task['name'] for task in page['results']], ['Task 3'])
+        self.assertIsNone(page['next'])
+
+    def test_invalid_cursor(self):
+        response = requests.get(BASE_URL + 'tasks-created-by-user/?cursor=not-a-cursor', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+        # Well-formed cursors with positions the ordering fields cannot take
+        for payload in (
+            {'o': 'deadline', 'p': [5, 5]},
+            {'o': 'deadline', 'p': [[1], 5]},
+            {'o': 'id', 'p': [None]},
+            {'o': 'id', 'p': 5},
+            {'o': 'id', 'p': ['x']},
+            {'o': 'deadline', 'p': ['2024-13-01', 1]},
+        ):
+            cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            response = requests.get(BASE_URL + 'tasks-created-by-user/', params={'cursor': cursor}, headers=self.headers)
+            self.assertEqual(response.status_code, 404, payload)
+            self.assertEqual(response.json(), {'detail': 'Invalid cursor'})
+
     def test_unauthorized_access(self):
         response = requests.get(BASE_URL + 'tasks-created-by-user/')
         self.assertEqual(response.status_code, 401)